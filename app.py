@@ -1,20 +1,16 @@
 """Modern Gradio Character Creation Interface"""
 
 import os
+import threading
 import gradio as gr
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
-import time
 
 from config import (
     CHARACTER_ETHNICITIES, CHARACTER_GENDERS, HAIR_COLORS, EYE_COLORS,
     BUILD_TYPES, HEIGHT_TYPES, AGE_RANGES, CLOTHING_STYLES,
     STYLE_CONFIGS, DEFAULT_TEST_PROMPTS, UI_CONFIG
 )
-from character_creator import CharacterCreator
-from utils import validate_api_key, create_thumbnail, format_file_size
-from character_manager import CharacterManager, CharacterInfo
-from zip_utils import CharacterZipper
 
 # Custom Seafoam Theme
 class SeafoamTheme(gr.themes.Base):
@@ -28,21 +24,61 @@ class SeafoamTheme(gr.themes.Base):
             font_mono=gr.themes.GoogleFont("JetBrains Mono")
         )
 
-# Initialize the character creator (debug mode will be toggled by UI)
-creator = CharacterCreator(debug_mode=False)
-char_manager = CharacterManager(debug=False)  # Disable debug for production
-char_zipper = CharacterZipper()
+# Core objects are created on first use so the fal_client/PIL/requests imports
+# they pull in do not delay startup (debug mode will be toggled by UI)
+creator = None
+char_manager = None
+char_zipper = None
+_INIT_LOCK = threading.Lock()
 seafoam_theme = SeafoamTheme()
 
+# Style selector choices and descriptions, computed once at import
+_STYLE_CHOICES = [(config["name"], key) for key, config in STYLE_CONFIGS.items()]
+_STYLE_MD = "\n\n".join(f"**{config['name']}**: {config['description']}" for config in STYLE_CONFIGS.values())
+
+# Character library cache, invalidated when the library directory signature changes
+_LIB_CACHE = {"signature": None, "grid": None, "status": None}
+_LIB_LOCK = threading.Lock()
+
+def _get_creator():
+    """Get the character creator, importing and creating it on first use"""
+    global creator
+    if creator is None:
+        with _INIT_LOCK:
+            if creator is None:
+                from character_creator import CharacterCreator
+                creator = CharacterCreator(debug_mode=False)
+    return creator
+
+def _get_char_manager():
+    """Get the character manager, importing and creating it on first use"""
+    global char_manager
+    if char_manager is None:
+        with _INIT_LOCK:
+            if char_manager is None:
+                from character_manager import CharacterManager
+                char_manager = CharacterManager(debug=False)  # Disable debug for production
+    return char_manager
+
+def _get_char_zipper():
+    """Get the character zipper, importing and creating it on first use"""
+    global char_zipper
+    if char_zipper is None:
+        with _INIT_LOCK:
+            if char_zipper is None:
+                from zip_utils import CharacterZipper
+                char_zipper = CharacterZipper()
+    return char_zipper
+
 def validate_setup():
     """Validate API setup"""
+    from utils import validate_api_key
     success, message = validate_api_key()
     return message
 
 def toggle_debug_mode(debug_enabled):
     """Toggle debug mode for the character creator"""
-    global creator
-    creator = CharacterCreator(debug_mode=debug_enabled)
+    _get_creator().set_debug(debug_enabled)
     status_msg = f"🔧 Debug mode {'enabled' if debug_enabled else 'disabled'}"
     if debug_enabled:
         status_msg += "\nDetailed API logs and timing will be shown during generation."
@@ -55,11 +91,14 @@ def create_character(ethnicity, gender, age_range, hair_color, eye_color,
     if not all([ethnicity, gender, age_range, hair_color, eye_color, build, height, clothing]):
         return "❌ Please fill in all required character details", None, ""
     
+    # One timestamp for both default IDs so they cannot straddle a second boundary
+    now = datetime.now()
+    
     if not session_id.strip():
-        session_id = f"Session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"Session_{now.strftime('%Y%m%d_%H%M%S')}"
     
     if not character_id.strip():
-        character_id = f"Character_{datetime.now().strftime('%H%M%S')}"
+        character_id = f"Character_{now.strftime('%H%M%S')}"
     
     # Build character config
     character_config = {
@@ -75,58 +114,39 @@ def create_character(ethnicity, gender, age_range, hair_color, eye_color,
     }
     
     # Create character
-    success, message, image_path = creator.create_base_character(
+    success, message, image_path = _get_creator().create_base_character(
         character_config, session_id, character_id
     )
     
     return message, image_path if success else None, session_id
 
 def generate_variations(test_prompts_text, max_images, progress=gr.Progress()):
-    """Generate consistency test variations"""
+    """Generate consistency test variations, streaming each image as it completes"""
     if not test_prompts_text.strip():
         test_prompts = DEFAULT_TEST_PROMPTS[:max_images]
     else:
         test_prompts = [p.strip() for p in test_prompts_text.strip().split('\n') if p.strip()]
     
-    generated_images = []
-    
-    for current, total, message, images in creator.generate_consistency_variations(test_prompts, max_images):
+    for current, total, message, images in _get_creator().generate_consistency_variations(test_prompts, max_images):
         progress(current / total if total > 0 else 0, desc=message)
-        generated_images = images
-        time.sleep(0.1)  # Smooth progress updates
-    
-    return message, generated_images
+        yield message, images
 
 def apply_style(style_name, source_images, progress=gr.Progress()):
-    """Apply style transfer to images"""
+    """Apply style transfer to images, streaming each styled image as it completes"""
     if not source_images:
-        return "❌ No source images available for style transfer", []
-    
-    # Handle Gradio Gallery format - convert tuples to string paths
-    if isinstance(source_images, list) and source_images:
-        source_paths = []
-        for img in source_images:
-            if isinstance(img, (tuple, list)):
-                # Extract the first element (image path) from tuple/list
-                source_paths.append(str(img[0]))
-            else:
-                # Already a string path
-                source_paths.append(str(img))
-    else:
-        source_paths = source_images
+        yield "❌ No source images available for style transfer", []
+        return
     
-    styled_images = []
+    # Gallery in filepath mode yields (path, caption) pairs - keep just the paths
+    source_paths = [img[0] if isinstance(img, (tuple, list)) else img for img in source_images]
     
-    for current, total, message, images in creator.apply_style_transfer(style_name, source_paths):
+    for current, total, message, images in _get_creator().apply_style_transfer(style_name, source_paths):
         progress(current / total if total > 0 else 0, desc=message)
-        styled_images = images
-        time.sleep(0.1)
-    
-    return message, styled_images
+        yield message, images
 
 def get_session_summary():
     """Get current session summary"""
-    summary = creator.get_generation_summary()
+    summary = _get_creator().get_generation_summary()
     
     # Check if there's an error status
     if "status" in summary:
@@ -157,20 +177,51 @@ def get_session_summary():
 
 def refresh_gallery():
     """Refresh the gallery with all generated images"""
-    images = creator.get_all_generated_images()
+    images = _get_creator().get_all_generated_images()
     return images
 
+def refresh_gallery_and_summary():
+    """Refresh the gallery and session summary in a single handler"""
+    return refresh_gallery(), get_session_summary()
+
+def generate_variations_and_refresh(test_prompts_text, max_images, progress=gr.Progress()):
+    """Generate variations, then refresh the complete gallery once they are saved"""
+    message, generated_images = "", []
+    for message, generated_images in generate_variations(test_prompts_text, max_images, progress):
+        yield message, generated_images, gr.update()
+    yield message, generated_images, refresh_gallery()
+
+def apply_style_and_refresh(style_name, source_images, progress=gr.Progress()):
+    """Apply style transfer, then refresh the complete gallery once images are saved"""
+    message, styled_images = "", []
+    for message, styled_images in apply_style(style_name, source_images, progress):
+        yield message, styled_images, gr.update()
+    yield message, styled_images, refresh_gallery()
+
 def refresh_character_library():
     """Refresh the character library and return character grid data"""
-    characters = char_manager.discover_characters()
+    # Serialize refreshes so a click during startup warmup waits for it and reuses the cache
+    with _LIB_LOCK:
+        return _build_character_library()
+
+def _build_character_library():
+    """Build character grid data, reusing the cache while the library is unchanged"""
+    manager = _get_char_manager()
+    # The manager only rescans when its own freshness check fails, so the library is walked at most once
+    characters = manager.discover_characters()
+    signature = manager.get_library_signature()
+    if signature == _LIB_CACHE["signature"]:
+        return _LIB_CACHE["grid"], _LIB_CACHE["status"]
     
     if not characters:
-        return [], "📭 No characters found. Create some characters first!"
+        character_grid, status_msg = [], "📭 No characters found. Create some characters first!"
+        _LIB_CACHE.update(signature=signature, grid=character_grid, status=status_msg)
+        return character_grid, status_msg
     
     # Prepare character grid data
     character_grid = []
     for char in characters:
-        preview_images = char_manager.get_character_preview_images(char, max_previews=3)
+        preview_images = manager.get_character_preview_images(char, max_previews=3)
         
         # Create character card info
         card_info = {
@@ -190,8 +241,16 @@ def refresh_character_library():
     total_images = sum(char.total_images for char in characters)
     status_msg = f"📚 Found {total_chars} characters with {total_images} total images"
     
+    _LIB_CACHE.update(signature=signature, grid=character_grid, status=status_msg)
     return character_grid, status_msg
 
+def _warm_library():
+    """Populate the character library cache in the background at startup"""
+    try:
+        refresh_character_library()
+    except Exception as e:
+        print(f"Character library warmup failed: {e}")
+
 def download_character_zip(character_data, include_metadata=True):
     """Create and download ZIP file for selected character"""
     if not character_data:
@@ -199,7 +258,7 @@ def download_character_zip(character_data, include_metadata=True):
     
     try:
         # Find the character
-        char = char_manager.get_character_by_id(
+        char = _get_char_manager().get_character_by_id(
             character_data["session_id"], 
             character_data["character_id"]
         )
@@ -208,7 +267,7 @@ def download_character_zip(character_data, include_metadata=True):
             return "❌ Character not found", None
         
         # Create ZIP
-        success, message, zip_path = char_zipper.create_character_zip(char, include_metadata)
+        success, message, zip_path = _get_char_zipper().create_character_zip(char, include_metadata)
         
         if success and zip_path:
             return message, zip_path
@@ -224,12 +283,15 @@ def download_batch_zip(selected_characters, include_metadata=True):
         return "❌ No characters selected", None
     
     try:
-        # Get character objects
+        # Get character objects, checking the library for changes once for the whole batch
+        manager = _get_char_manager()
+        manager.discover_characters()
         characters = []
         for char_data in selected_characters:
-            char = char_manager.get_character_by_id(
+            char = manager.get_character_by_id(
                 char_data["session_id"], 
-                char_data["character_id"]
+                char_data["character_id"],
+                refresh=False
             )
             if char:
                 characters.append(char)
@@ -238,7 +300,7 @@ def download_batch_zip(selected_characters, include_metadata=True):
             return "❌ No valid characters found", None
         
         # Create batch ZIP
-        success, message, zip_path = char_zipper.create_batch_zip(characters, include_metadata)
+        success, message, zip_path = _get_char_zipper().create_batch_zip(characters, include_metadata)
         
         if success and zip_path:
             return message, zip_path
@@ -254,7 +316,7 @@ def get_character_details(character_data):
         return "No character selected"
     
     try:
-        char = char_manager.get_character_by_id(
+        char = _get_char_manager().get_character_by_id(
             character_data["session_id"], 
             character_data["character_id"]
         )
@@ -474,6 +536,7 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
                 with gr.Column():
                     variations_gallery = gr.Gallery(
                         label="Generated Variations",
+                        type="filepath",
                         columns=3,
                         height=400
                     )
@@ -485,14 +548,13 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
                     gr.Markdown("### Available Styles")
                     
                     style_selector = gr.Radio(
-                        choices=[(config["name"], key) for key, config in STYLE_CONFIGS.items()],
+                        choices=_STYLE_CHOICES,
                         label="Select Style",
                         value="ghibli"
                     )
                     
                     # Style descriptions
-                    for key, config in STYLE_CONFIGS.items():
-                        gr.Markdown(f"**{config['name']}**: {config['description']}")
+                    gr.Markdown(_STYLE_MD)
                     
                     apply_style_btn = gr.Button(
                         "🎨 Apply Style Transfer",
@@ -511,6 +573,7 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
                 with gr.Column():
                     styled_gallery = gr.Gallery(
                         label="Styled Images",
+                        type="filepath",
                         columns=3,
                         height=400
                     )
@@ -532,6 +595,7 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
                 with gr.Column(scale=3):
                     complete_gallery = gr.Gallery(
                         label="All Generated Images",
+                        type="filepath",
                         columns=4,
                         height=600
                     )
@@ -596,6 +660,7 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
                     # Character grid/gallery
                     character_gallery = gr.Gallery(
                         label="Characters",
+                        type="filepath",
                         columns=3,
                         height=500,
                         object_fit="cover",
@@ -626,48 +691,43 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
             ethnicity, gender, age_range, hair_color, eye_color,
             build, height, clothing, facial_features, session_id, character_id
         ],
-        outputs=[generation_status, base_character_image, session_id]
+        outputs=[generation_status, base_character_image, session_id],
+        concurrency_limit=1,
+        concurrency_id="generation"
     )
     
+    # Generation handlers share one creator session, so they run one at a time (each run
+    # already fans out its API calls); they also refresh the complete gallery once saved
     generate_variations_btn.click(
-        fn=generate_variations,
+        fn=generate_variations_and_refresh,
         inputs=[test_prompts, max_variations],
-        outputs=[variations_status, variations_gallery]
+        outputs=[variations_status, variations_gallery, complete_gallery],
+        concurrency_limit=1,
+        concurrency_id="generation"
     )
     
     apply_style_btn.click(
-        fn=apply_style,
+        fn=apply_style_and_refresh,
         inputs=[style_selector, variations_gallery],
-        outputs=[style_status, styled_gallery]
-    )
-    
-    refresh_gallery_btn.click(
-        fn=refresh_gallery,
-        outputs=complete_gallery
+        outputs=[style_status, styled_gallery, complete_gallery],
+        concurrency_limit=1,
+        concurrency_id="generation"
     )
     
     refresh_gallery_btn.click(
-        fn=get_session_summary,
-        outputs=session_summary
-    )
-    
-    # Auto-refresh gallery when variations are generated
-    generate_variations_btn.click(
-        fn=refresh_gallery,
-        outputs=complete_gallery
-    )
-    
-    # Auto-refresh gallery when styles are applied
-    apply_style_btn.click(
-        fn=refresh_gallery,
-        outputs=complete_gallery
+        fn=refresh_gallery_and_summary,
+        outputs=[complete_gallery, session_summary]
     )
     
     # Character Library event handlers
-    def handle_library_refresh():
+    def handle_library_refresh(current_grid):
         """Handle library refresh with proper return format"""
         character_grid, status_msg = refresh_character_library()
         
+        # Gallery already shows this library - skip re-sending it
+        if character_grid == current_grid:
+            return gr.update(), status_msg, gr.update()
+        
         # Format for gallery display
         gallery_items = []
         for char_data in character_grid:
@@ -703,6 +763,7 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
     # Connect Character Library events
     refresh_library_btn.click(
         fn=handle_library_refresh,
+        inputs=[character_grid_data],
         outputs=[character_gallery, library_status, character_grid_data]
     )
     
@@ -724,13 +785,26 @@ with gr.Blocks(theme=seafoam_theme, title=UI_CONFIG["title"]) as app:
         outputs=[download_status, gr.File()]
     )
 
+def launch_app(**launch_kwargs):
+    """Configure the request queue, warm the library and launch the application (shared by app.py and launch.py)"""
+    # Queue requests so library, gallery and download handlers can run concurrently
+    app.queue(
+        default_concurrency_limit=UI_CONFIG["queue_concurrency_limit"],
+        max_size=UI_CONFIG["queue_max_size"]
+    )
+    
+    # Discover characters before the Library tab is first opened
+    threading.Thread(target=_warm_library, name="library-warmup", daemon=True).start()
+    
+    app.launch(**launch_kwargs)
+
 # Launch the application
 if __name__ == "__main__":
     print("🚀 Starting AI Character Creation Studio...")
     print("📋 Make sure to set your FAL_KEY environment variable")
     print("🌐 The application will be available at http://localhost:7860")
     
-    app.launch(
+    launch_app(
         server_name="0.0.0.0",
         server_port=7860,
         share=False,
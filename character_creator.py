@@ -3,13 +3,14 @@
 import os
 import time
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional, Generator
+from typing import Dict, Any, List, Tuple, Optional, Generator, Callable, Sequence
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from config import DEFAULT_API_CONFIG, STYLE_CONFIGS, DEFAULT_TEST_PROMPTS
+from config import DEFAULT_API_CONFIG, STYLE_CONFIGS, DEFAULT_TEST_PROMPTS, CONCURRENCY_CONFIG
 from utils import (
     APIWrapper, create_session_folder, build_character_prompt, 
-    save_image_from_url, create_metadata_entry, save_metadata,
+    save_image_from_url, create_metadata_entry, save_metadata, append_metadata_line,
     format_progress_message, convert_image_to_data_url
 )
 
@@ -20,8 +21,17 @@ class CharacterCreator:
         self.api = APIWrapper(debug_mode=debug_mode)
         self.current_session = None
         self.base_image_path = None
+        # FAL storage URL for the base image, uploaded once and reused by every variation
+        self._base_image_url = None
         self.debug_mode = debug_mode
+        # Directory -> (mtime_ns, sorted PNG paths), rescanned only when the directory changes
+        self._png_index: Dict[str, Tuple[int, List[str]]] = {}
         
+    def set_debug(self, debug_mode: bool) -> None:
+        """Switch debug logging on or off, keeping the current session and API client"""
+        self.debug_mode = debug_mode
+        self.api.debug_mode = debug_mode
+    
     def validate_setup(self) -> Tuple[bool, str]:
         """Validate API key and setup"""
         if 'FAL_KEY' not in os.environ:
@@ -72,6 +82,7 @@ class CharacterCreator:
                 
                 if save_image_from_url(image_url, base_image_path):
                     self.base_image_path = base_image_path
+                    self._base_image_url = None
                     
                     # Save metadata
                     metadata = create_metadata_entry(prompt, DEFAULT_API_CONFIG.imagen4_params, result, base_image_path)
@@ -90,7 +101,7 @@ class CharacterCreator:
         except Exception as e:
             return False, f"❌ Base character creation failed: {str(e)}", None
     
-    def generate_consistency_variations(self, test_prompts: List[str], 
+    def generate_consistency_variations(self, test_prompts: Sequence[str], 
                                       max_images: int = 10) -> Generator[Tuple[int, int, str, List[str]], None, None]:
         """Generate consistency test variations using Kontext Max"""
         if not self.base_image_path or not self.base_image_path.exists():
@@ -106,57 +117,48 @@ class CharacterCreator:
             successful_images = []
             failed_prompts = []
             
-            # Convert base image to data URL
-            base_image_url = convert_image_to_data_url(self.base_image_path)
+            # Reference the base image by URL so it is not re-sent with every prompt
+            base_image_url = self._get_base_image_url()
             if not base_image_url:
                 yield 0, 0, "❌ Failed to convert base image to data URL", []
                 return
             
-            for i, prompt in enumerate(prompts_to_process, 1):
-                try:
-                    progress_msg = format_progress_message(i, len(prompts_to_process), "Generating variations")
-                    yield i, len(prompts_to_process), progress_msg, successful_images
-                    
-                    # Call Kontext Max API with status tracking
-                    response = self.api.call_kontext_max(prompt, base_image_url, DEFAULT_API_CONFIG.kontext_max_params)
-                    
-                    if response["success"]:
-                        result = response["result"]
-                        elapsed_time = response.get('elapsed_time', 0)
-                        
-                        if result.get('images') and len(result['images']) > 0:
-                            image_url = result['images'][0]['url']
-                            output_path = consistency_path / f"Realistic_{i:03d}.png"
-                            
-                            print(f"💾 Saving variation {i}...")
-                            
-                            if save_image_from_url(image_url, output_path):
-                                successful_images.append(str(output_path))
-                                
-                                # Save metadata with timing info
-                                metadata = create_metadata_entry(prompt, DEFAULT_API_CONFIG.kontext_max_params, result, output_path)
-                                metadata['generation_time'] = elapsed_time
-                                metadata_path = consistency_path / f"Realistic_{i:03d}_metadata.json"
-                                save_metadata(metadata, metadata_path)
-                                
-                                print(f"✅ Variation {i} completed in {elapsed_time:.1f}s")
-                            else:
-                                print(f"❌ Failed to save variation {i}")
-                                failed_prompts.append((i, prompt))
-                        else:
-                            print(f"❌ No images returned for variation {i}")
-                            failed_prompts.append((i, prompt))
+            total = len(prompts_to_process)
+            yield 0, total, format_progress_message(0, total, "Generating variations"), []
+            
+            # Fan the prompts out to the API concurrently and report each as it completes
+            max_workers = max(1, min(CONCURRENCY_CONFIG["max_concurrent_requests"], total))
+            # One wall-clock timestamp per batch; records add their offset from it
+            batch_timestamp = datetime.now().isoformat()
+            batch_start = time.monotonic()
+            jobs = list(enumerate(prompts_to_process, 1))
+            pipeline = self._run_pipeline(
+                jobs,
+                lambda i, prompt: self._request_variation(i, prompt, base_image_url),
+                lambda i, prompt, result: self._save_variation(i, prompt, result, consistency_path, batch_timestamp),
+                max_workers
+            )
+            
+            # Report at most ~10 progress updates per batch
+            stride = max(1, total // 10)
+            
+            # Per-image metadata goes to one append-only JSONL log instead of a file per image
+            with open(consistency_path / "consistency.jsonl", 'ab', buffering=1 << 20) as metadata_log:
+                for completed, ((i, prompt), outcome) in enumerate(pipeline, 1):
+                    if outcome:
+                        output_path, metadata = outcome
+                        metadata["batch_offset_seconds"] = round(time.monotonic() - batch_start, 3)
+                        append_metadata_line(metadata_log, {**metadata, "index": i})
+                        successful_images.append(output_path)
+                        successful_images.sort()
                     else:
-                        error_msg = f"❌ API call failed for variation {i}: {response['error']}"
-                        if 'elapsed_time' in response:
-                            error_msg += f" (took {response['elapsed_time']:.1f}s)"
-                        print(error_msg)
                         failed_prompts.append((i, prompt))
                     
-                except Exception as e:
-                    print(f"Failed to generate variation {i}: {e}")
-                    failed_prompts.append((i, prompt))
-                    continue
+                    if completed % stride == 0 or completed == total:
+                        progress_msg = format_progress_message(completed, total, "Generating variations")
+                        yield completed, total, progress_msg, list(successful_images)
+            
+            failed_prompts.sort()
             
             # Save session metadata
             session_metadata = {
@@ -175,6 +177,81 @@ class CharacterCreator:
         except Exception as e:
             yield 0, 0, f"❌ Consistency generation failed: {str(e)}", []
     
+    def _get_base_image_url(self) -> Optional[str]:
+        """Get the base image's FAL storage URL, uploading it once; falls back to a data URL"""
+        if self._base_image_url is None:
+            self._base_image_url = self.api.upload_image(self.base_image_path)
+        return self._base_image_url or convert_image_to_data_url(self.base_image_path)
+    
+    def _run_pipeline(self, jobs: List[Tuple[Any, ...]], request: Callable[..., Optional[Dict[str, Any]]],
+                      save: Callable[..., Optional[Any]],
+                      max_workers: int) -> Generator[Tuple[Tuple[Any, ...], Optional[Any]], None, None]:
+        """Run API requests and result downloads on separate pools, yielding (job, save result) as jobs finish
+        
+        Each job's request(*job) runs on the API pool; its response is handed to save(*job, response)
+        on the download pool, so API slots are freed while earlier results are still downloading.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as api_pool, \
+                ThreadPoolExecutor(max_workers=CONCURRENCY_CONFIG["max_concurrent_downloads"]) as download_pool:
+            # future -> (job, whether it is the download stage)
+            pending = {api_pool.submit(request, *job): (job, False) for job in jobs}
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, is_download = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        print(f"Failed to process image {job[0]}: {e}")
+                        outcome = None
+                    
+                    if is_download or outcome is None:
+                        yield job, outcome
+                    else:
+                        pending[download_pool.submit(save, *job, outcome)] = (job, True)
+    
+    def _request_variation(self, i: int, prompt: str, base_image_url: str) -> Optional[Dict[str, Any]]:
+        """Request a single consistency variation, returning the API response on success"""
+        # Call Kontext Max API with status tracking
+        response = self.api.call_kontext_max(prompt, base_image_url, DEFAULT_API_CONFIG.kontext_max_params)
+        
+        if not response["success"]:
+            error_msg = f"❌ API call failed for variation {i}: {response['error']}"
+            if 'elapsed_time' in response:
+                error_msg += f" (took {response['elapsed_time']:.1f}s)"
+            print(error_msg)
+            return None
+        
+        if not response["result"].get('images'):
+            print(f"❌ No images returned for variation {i}")
+            return None
+        
+        return response
+    
+    def _save_variation(self, i: int, prompt: str, response: Dict[str, Any], consistency_path: Path,
+                        batch_timestamp: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Download and save a single consistency variation, returning (path, metadata) on success"""
+        result = response["result"]
+        elapsed_time = response.get('elapsed_time', 0)
+        
+        image_url = result['images'][0]['url']
+        output_path = consistency_path / f"Realistic_{i:03d}.png"
+        
+        print(f"💾 Saving variation {i}...")
+        
+        if not save_image_from_url(image_url, output_path):
+            print(f"❌ Failed to save variation {i}")
+            return None
+        
+        # Metadata with timing info, logged by the caller
+        metadata = create_metadata_entry(prompt, DEFAULT_API_CONFIG.kontext_max_params, result, output_path,
+                                         batch_timestamp)
+        metadata['generation_time'] = elapsed_time
+        
+        print(f"✅ Variation {i} completed in {elapsed_time:.1f}s")
+        return str(output_path), metadata
+    
     def apply_style_transfer(self, style_name: str, 
                            source_images: List[str]) -> Generator[Tuple[int, int, str, List[str]], None, None]:
         """Apply LoRA style transfer to generated images"""
@@ -194,64 +271,43 @@ class CharacterCreator:
             styled_images = []
             failed_transfers = []
             
-            for i, source_image_path in enumerate(source_images, 1):
-                try:
-                    progress_msg = format_progress_message(i, len(source_images), f"Applying {style_config['name']} style")
-                    yield i, len(source_images), progress_msg, styled_images
-                    
-                    # Convert source image to data URL
-                    source_image_url = convert_image_to_data_url(Path(source_image_path))
-                    if not source_image_url:
-                        print(f"Failed to convert {source_image_path} to data URL")
-                        failed_transfers.append((i, source_image_path))
-                        continue
-                    
-                    # Call Kontext LoRA API with status tracking
-                    response = self.api.call_kontext_lora(source_image_url, style_config, DEFAULT_API_CONFIG.kontext_lora_params)
-                    
-                    if response["success"]:
-                        result = response["result"]
-                        elapsed_time = response.get('elapsed_time', 0)
-                        
-                        if result.get('images') and len(result['images']) > 0:
-                            styled_image_url = result['images'][0]['url']
-                            output_path = styles_path / f"{style_config['name']}_{i:03d}.png"
-                            
-                            print(f"💾 Saving {style_config['name']} styled image {i}...")
-                            
-                            if save_image_from_url(styled_image_url, output_path):
-                                styled_images.append(str(output_path))
-                                
-                                # Save metadata with timing info
-                                metadata = create_metadata_entry(
-                                    style_config["prompt_template"], 
-                                    DEFAULT_API_CONFIG.kontext_lora_params, 
-                                    result, 
-                                    output_path
-                                )
-                                metadata['generation_time'] = elapsed_time
-                                metadata['style_name'] = style_config['name']
-                                metadata_path = styles_path / f"{style_config['name']}_{i:03d}_metadata.json"
-                                save_metadata(metadata, metadata_path)
-                                
-                                print(f"✅ {style_config['name']} style {i} completed in {elapsed_time:.1f}s")
-                            else:
-                                print(f"❌ Failed to save {style_config['name']} styled image {i}")
-                                failed_transfers.append((i, source_image_path))
-                        else:
-                            print(f"❌ No styled images returned for {style_config['name']} {i}")
-                            failed_transfers.append((i, source_image_path))
+            total = len(source_images)
+            yield 0, total, format_progress_message(0, total, f"Applying {style_config['name']} style"), []
+            
+            # Fan the source images out to the API concurrently and report each as it completes
+            max_workers = max(1, min(CONCURRENCY_CONFIG["max_concurrent_style_requests"], total))
+            # One wall-clock timestamp per batch; records add their offset from it
+            batch_timestamp = datetime.now().isoformat()
+            batch_start = time.monotonic()
+            jobs = list(enumerate(source_images, 1))
+            pipeline = self._run_pipeline(
+                jobs,
+                lambda i, source_image_path: self._request_style(i, source_image_path, style_config),
+                lambda i, source_image_path, result: self._save_styled_image(i, result, style_config, styles_path,
+                                                                             batch_timestamp),
+                max_workers
+            )
+            
+            # Report at most ~10 progress updates per batch
+            stride = max(1, total // 10)
+            
+            # Per-image metadata goes to one append-only JSONL log instead of a file per image
+            with open(styles_path / "transfers.jsonl", 'ab', buffering=1 << 20) as metadata_log:
+                for completed, ((i, source_image_path), outcome) in enumerate(pipeline, 1):
+                    if outcome:
+                        output_path, metadata = outcome
+                        metadata["batch_offset_seconds"] = round(time.monotonic() - batch_start, 3)
+                        append_metadata_line(metadata_log, {**metadata, "index": i})
+                        styled_images.append(output_path)
+                        styled_images.sort()
                     else:
-                        error_msg = f"❌ {style_config['name']} style API call failed for image {i}: {response['error']}"
-                        if 'elapsed_time' in response:
-                            error_msg += f" (took {response['elapsed_time']:.1f}s)"
-                        print(error_msg)
                         failed_transfers.append((i, source_image_path))
                     
-                except Exception as e:
-                    print(f"Failed to apply style to image {i}: {e}")
-                    failed_transfers.append((i, source_image_path))
-                    continue
+                    if completed % stride == 0 or completed == total:
+                        progress_msg = format_progress_message(completed, total, f"Applying {style_config['name']} style")
+                        yield completed, total, progress_msg, list(styled_images)
+            
+            failed_transfers.sort()
             
             # Save style transfer session metadata
             style_session_metadata = {
@@ -272,6 +328,60 @@ class CharacterCreator:
         except Exception as e:
             yield 0, 0, f"❌ Style transfer failed: {str(e)}", []
     
+    def _request_style(self, i: int, source_image_path: str,
+                       style_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Request a style transfer for a single source image, returning the API response on success"""
+        # Convert source image to data URL
+        source_image_url = convert_image_to_data_url(source_image_path)
+        if not source_image_url:
+            print(f"Failed to convert {source_image_path} to data URL")
+            return None
+        
+        # Call Kontext LoRA API with status tracking
+        response = self.api.call_kontext_lora(source_image_url, style_config, DEFAULT_API_CONFIG.kontext_lora_params)
+        
+        if not response["success"]:
+            error_msg = f"❌ {style_config['name']} style API call failed for image {i}: {response['error']}"
+            if 'elapsed_time' in response:
+                error_msg += f" (took {response['elapsed_time']:.1f}s)"
+            print(error_msg)
+            return None
+        
+        if not response["result"].get('images'):
+            print(f"❌ No styled images returned for {style_config['name']} {i}")
+            return None
+        
+        return response
+    
+    def _save_styled_image(self, i: int, response: Dict[str, Any], style_config: Dict[str, Any],
+                           styles_path: Path, batch_timestamp: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Download and save a single styled image, returning (path, metadata) on success"""
+        result = response["result"]
+        elapsed_time = response.get('elapsed_time', 0)
+        
+        styled_image_url = result['images'][0]['url']
+        output_path = styles_path / f"{style_config['name']}_{i:03d}.png"
+        
+        print(f"💾 Saving {style_config['name']} styled image {i}...")
+        
+        if not save_image_from_url(styled_image_url, output_path):
+            print(f"❌ Failed to save {style_config['name']} styled image {i}")
+            return None
+        
+        # Metadata with timing info, logged by the caller
+        metadata = create_metadata_entry(
+            style_config["prompt_template"],
+            DEFAULT_API_CONFIG.kontext_lora_params,
+            result,
+            output_path,
+            batch_timestamp
+        )
+        metadata['generation_time'] = elapsed_time
+        metadata['style_name'] = style_config['name']
+        
+        print(f"✅ {style_config['name']} style {i} completed in {elapsed_time:.1f}s")
+        return str(output_path), metadata
+    
     def get_generation_summary(self) -> Dict[str, Any]:
         """Get summary of current generation session"""
         if not self.current_session:
@@ -289,18 +399,13 @@ class CharacterCreator:
             if self.base_image_path and self.base_image_path.exists():
                 summary["images_count"]["base"] = 1
             
-            consistency_path = self.current_session / "ConsistencyTests"
-            if consistency_path.exists():
-                realistic_images = list(consistency_path.glob("Realistic_*.png"))
-                summary["images_count"]["realistic_variations"] = len(realistic_images)
-            
-            styles_path = self.current_session / "Styles"
-            if styles_path.exists():
-                for style_name, style_config in STYLE_CONFIGS.items():
-                    style_folder = styles_path / style_config["name"]
-                    if style_folder.exists():
-                        style_images = list(style_folder.glob("*.png"))
-                        summary["images_count"][f"{style_name}_style"] = len(style_images)
+            session_images = self._scan_session()
+            if session_images["realistic"]:
+                summary["images_count"]["realistic_variations"] = len(session_images["realistic"])
+            
+            for style_name, style_images in session_images["styles"].items():
+                if style_images:
+                    summary["images_count"][f"{style_name}_style"] = len(style_images)
             
             total_images = sum(summary["images_count"].values())
             summary["images_count"]["total"] = total_images
@@ -322,23 +427,54 @@ class CharacterCreator:
             if self.base_image_path and self.base_image_path.exists():
                 images.append((str(self.base_image_path), "Base Character"))
             
+            session_images = self._scan_session()
+            
             # Realistic variations
-            consistency_path = self.current_session / "ConsistencyTests"
-            if consistency_path.exists():
-                for img_path in sorted(consistency_path.glob("Realistic_*.png")):
-                    images.append((str(img_path), f"Realistic Variation"))
+            for img_path in session_images["realistic"]:
+                images.append((img_path, f"Realistic Variation"))
             
             # Styled images
-            styles_path = self.current_session / "Styles"
-            if styles_path.exists():
-                for style_name, style_config in STYLE_CONFIGS.items():
-                    style_folder = styles_path / style_config["name"]
-                    if style_folder.exists():
-                        for img_path in sorted(style_folder.glob("*.png")):
-                            images.append((str(img_path), f"{style_config['name']} Style"))
+            for style_name, style_images in session_images["styles"].items():
+                for img_path in style_images:
+                    images.append((img_path, f"{STYLE_CONFIGS[style_name]['name']} Style"))
             
             return images
             
         except Exception as e:
             print(f"Error collecting images: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    def _scan_session(self) -> Dict[str, Any]:
+        """Collect the current session's realistic and per-style PNG paths from the directory index"""
+        consistency_path = self.current_session / "ConsistencyTests"
+        styles_path = self.current_session / "Styles"
+        return {
+            "realistic": self._list_pngs(consistency_path, "Realistic_"),
+            "styles": {
+                style_name: self._list_pngs(styles_path / style_config["name"])
+                for style_name, style_config in STYLE_CONFIGS.items()
+            }
+        }
+    
+    def _list_pngs(self, directory: Path, prefix: str = "") -> List[str]:
+        """List sorted PNG paths in a directory, rescanning only when its mtime changes"""
+        key = str(directory)
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            self._png_index.pop(key, None)
+            return []
+        
+        cached = self._png_index.get(key)
+        if cached is None or cached[0] != mtime_ns:
+            with os.scandir(key) as entries:
+                paths = sorted(
+                    entry.path for entry in entries
+                    if entry.name.endswith(".png") and not entry.name.startswith(".") and entry.is_file()
+                )
+            cached = (mtime_ns, paths)
+            self._png_index[key] = cached
+        
+        if not prefix:
+            return list(cached[1])
+        return [path for path in cached[1] if os.path.basename(path).startswith(prefix)]
\ No newline at end of file
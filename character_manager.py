@@ -1,36 +1,129 @@
 """Character management and discovery utilities"""
 
 import os
-import json
+import hashlib
+import heapq
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import glob
 
+from config import CHARACTER_MANAGEMENT_CONFIG
+from utils import create_thumbnail
+
+# Use the faster orjson parser for metadata if installed (both accept raw bytes)
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+    from json import loads as json_loads
+    
+    def json_dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes like orjson.dumps"""
+        return json.dumps(obj).encode('utf-8')
+
+# Bump when the discovery index layout changes so stale files are ignored
+INDEX_VERSION = 1
+
+# Directory names never treated as sessions (hidden directories are skipped too)
+SKIP_DIRECTORIES = frozenset({'__pycache__'})
+
+# Base image file names, in order of preference
+BASE_IMAGE_NAMES = ("Base-Character.png", "Base-Image.png")
+
 @dataclass
 class CharacterInfo:
     """Data class for character information"""
     session_id: str
     character_id: str
     path: Path
-    creation_date: datetime
+    creation_ctime: float
     base_image_path: Optional[Path]
-    base_metadata: Optional[Dict[str, Any]]
+    base_metadata_path: Optional[Path]
     
     # Image counts
     realistic_count: int = 0
-    styled_counts: Dict[str, int] = None
+    styled_counts: Dict[str, int] = field(default_factory=dict)
     total_images: int = 0
     
     # Generation info
-    character_config: Optional[Dict[str, Any]] = None
     generation_time: Optional[float] = None
-    prompt: Optional[str] = None
     
-    def __post_init__(self):
-        if self.styled_counts is None:
-            self.styled_counts = {}
+    # Parsed base metadata, filled in on first access
+    _base_metadata: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    _metadata_loaded: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def to_index_record(self) -> Dict[str, Any]:
+        """Serialize the discovered fields for the persistent discovery index"""
+        return {
+            "session_id": self.session_id,
+            "character_id": self.character_id,
+            "path": str(self.path),
+            "creation_ctime": self.creation_ctime,
+            "base_image_path": str(self.base_image_path) if self.base_image_path else None,
+            "base_metadata_path": str(self.base_metadata_path) if self.base_metadata_path else None,
+            "realistic_count": self.realistic_count,
+            "styled_counts": self.styled_counts,
+            "total_images": self.total_images
+        }
+    
+    @classmethod
+    def from_index_record(cls, record: Dict[str, Any]) -> 'CharacterInfo':
+        """Rebuild a character from a persistent discovery index record"""
+        return cls(
+            session_id=record["session_id"],
+            character_id=record["character_id"],
+            path=Path(record["path"]),
+            creation_ctime=record["creation_ctime"],
+            base_image_path=Path(record["base_image_path"]) if record["base_image_path"] else None,
+            base_metadata_path=Path(record["base_metadata_path"]) if record["base_metadata_path"] else None,
+            realistic_count=record["realistic_count"],
+            styled_counts=record["styled_counts"],
+            total_images=record["total_images"]
+        )
+    
+    @property
+    def creation_date(self) -> datetime:
+        """Directory creation time as a datetime (sorting uses the raw ctime)"""
+        return datetime.fromtimestamp(self.creation_ctime)
+    
+    @property
+    def base_metadata(self) -> Optional[Dict[str, Any]]:
+        """Base character metadata, read from disk the first time it is needed"""
+        if not self._metadata_loaded:
+            if self.base_metadata_path:
+                try:
+                    self._base_metadata = json_loads(self.base_metadata_path.read_bytes())
+                except Exception as e:
+                    print(f"Error loading base metadata: {e}")
+            self._metadata_loaded = True
+        return self._base_metadata
+    
+    @property
+    def prompt(self) -> Optional[str]:
+        """Prompt used to generate the base character"""
+        return self.base_metadata.get('prompt') if self.base_metadata else None
+    
+    @property
+    def character_config(self) -> Optional[Dict[str, Any]]:
+        """Character config (not recorded in metadata yet, so empty when parameters exist)"""
+        if self.base_metadata and 'parameters' in self.base_metadata:
+            return {}
+        return None
+
+def _list_subdirectories(path: str) -> List[Tuple[str, str, int]]:
+    """List (name, path, mtime_ns) for each subdirectory of a directory"""
+    try:
+        with os.scandir(path) as entries:
+            return [(entry.name, entry.path, entry.stat().st_mtime_ns)
+                    for entry in entries if entry.is_dir()]
+    except OSError:
+        return []
 
 class CharacterManager:
     """Manages character discovery, metadata, and operations"""
@@ -38,29 +131,62 @@ class CharacterManager:
     def __init__(self, root_directory: str = ".", debug: bool = False):
         self.root_directory = Path(root_directory)
         self._characters_cache = None
-        self._last_scan_time = None
+        # Directory path -> st_mtime_ns recorded when the cache was built
+        self._cache_signature: Dict[str, int] = {}
+        # Character path -> (directory mtimes of its tree, analyzed character) from the last scan
+        self._analysis_cache: Dict[str, Tuple[Tuple[Tuple[str, int], ...], Optional[CharacterInfo]]] = {}
+        # (session_id, character_id) -> character, rebuilt with the discovery cache
+        self._index: Dict[Tuple[str, str], CharacterInfo] = {}
+        # Guards the caches above and the saved index; UI handlers discover concurrently
+        self._discovery_lock = threading.Lock()
         self.debug = debug
         
         # Only scan the specified root directory
         self.scan_locations = [Path(root_directory).resolve()]
         
+        # Preview thumbnails persist here between runs, keyed by source image path
+        self.thumbnail_dir = Path(CHARACTER_MANAGEMENT_CONFIG["thumbnail_cache_dir"])
+        
+        # Discovery results persist here between runs, one file per library root
+        locations_key = "\n".join(str(location) for location in self.scan_locations)
+        self.index_path = (Path(CHARACTER_MANAGEMENT_CONFIG["index_cache_dir"]) /
+                           f"{hashlib.sha1(locations_key.encode('utf-8')).hexdigest()}.json")
+        self._index_loaded = False
+        
         if self.debug:
             print(f"[DEBUG] Scanning only root directory: {self.scan_locations[0]}")
     
     def discover_characters(self, force_refresh: bool = False) -> List[CharacterInfo]:
         """Discover all character sessions in the root directory"""
-        current_time = datetime.now()
+        # One discovery at a time, so scans never see (or save) a half-rebuilt cache
+        with self._discovery_lock:
+            return self._discover_characters(force_refresh)
+    
+    def _discover_characters(self, force_refresh: bool) -> List[CharacterInfo]:
+        """Discover characters, with _discovery_lock held"""
+        # Start from the previous run's results, so only changed characters are re-analyzed
+        if not self._index_loaded:
+            self._index_loaded = True
+            self._load_index()
         
-        # Use cache if available and recent (within 30 seconds)
+        # Use cache while no directory in the library has changed
         if (not force_refresh and 
             self._characters_cache is not None and 
-            self._last_scan_time is not None and 
-            (current_time - self._last_scan_time).seconds < 30):
+            self._is_cache_fresh()):
             return self._characters_cache
         
-        characters = []
+        # Record the signature before scanning so changes made mid-scan trigger a rescan
+        signature = {}
+        fingerprints = {}
+        for path, mtime_ns, char_path in self._walk_library():
+            signature[path] = mtime_ns
+            if char_path:
+                fingerprints.setdefault(char_path, []).append((path, mtime_ns))
+        fingerprints = {char_path: tuple(entries) for char_path, entries in fingerprints.items()}
         
-        # Scan all configured locations
+        # Scan all configured locations, removing duplicates (same session_id + character_id)
+        # as characters stream in and keeping the first occurrence
+        index = {}
         for scan_location in self.scan_locations:
             if not scan_location.exists():
                 if self.debug:
@@ -71,196 +197,342 @@ class CharacterManager:
                 print(f"[DEBUG] Scanning location: {scan_location}")
             
             try:
-                location_characters = self._scan_location(scan_location)
-                characters.extend(location_characters)
+                found = 0
+                for char in self._scan_location(scan_location, fingerprints):
+                    found += 1
+                    if index.setdefault((char.session_id, char.character_id), char) is not char and self.debug:
+                        print(f"[DEBUG] Skipping duplicate character: {char.session_id}/{char.character_id}")
                 if self.debug:
-                    print(f"[DEBUG] Found {len(location_characters)} characters in {scan_location}")
+                    print(f"[DEBUG] Found {found} characters in {scan_location}")
             except Exception as e:
                 print(f"Error scanning location {scan_location}: {e}")
                 continue
         
-        # Remove duplicates (same session_id + character_id)
-        seen = set()
-        unique_characters = []
-        for char in characters:
-            char_key = (char.session_id, char.character_id)
-            if char_key not in seen:
-                seen.add(char_key)
-                unique_characters.append(char)
-            elif self.debug:
-                print(f"[DEBUG] Skipping duplicate character: {char.session_id}/{char.character_id}")
-        
-        characters = unique_characters
-        
-        # Sort by creation date (newest first)
-        characters.sort(key=lambda x: x.creation_date, reverse=True)
+        # Sort by creation date (newest first); the index dict preserves discovery order for ties
+        characters = sorted(index.values(), key=lambda x: x.creation_ctime, reverse=True)
         
         # Update cache
         self._characters_cache = characters
-        self._last_scan_time = current_time
+        self._index = index
+        self._cache_signature = signature
+        self._analysis_cache = {char_path: cached for char_path, cached in self._analysis_cache.items()
+                                if char_path in fingerprints}
+        self._save_index()
         
         if self.debug:
             print(f"[DEBUG] Total unique characters found: {len(characters)}")
         
         return characters
     
-    def _scan_location(self, location: Path) -> List[CharacterInfo]:
-        """Scan a specific location for characters"""
-        characters = []
+    def _load_index(self):
+        """Seed the discovery caches from the index saved by a previous run"""
+        try:
+            index_data = json_loads(self.index_path.read_bytes())
+            if index_data.get("version") != INDEX_VERSION:
+                return
+            
+            analysis_cache = {}
+            for char_path, entry in index_data["characters"].items():
+                record = entry["character"]
+                char_info = CharacterInfo.from_index_record(record) if record else None
+                analysis_cache[char_path] = (tuple(tuple(item) for item in entry["fingerprint"]), char_info)
+            
+            characters = [analysis_cache[char_path][1] for char_path in index_data["order"]]
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading character index {self.index_path}: {e}")
+            return
         
-        try:            
-            # Pattern 1: Standard format - Session_*/Char_*
-            session_count = 0
-            for session_path in location.glob("Session_*"):
-                if not session_path.is_dir():
+        self._analysis_cache = analysis_cache
+        self._characters_cache = characters
+        self._index = {(char.session_id, char.character_id): char for char in characters}
+        self._cache_signature = index_data["signature"]
+        
+        if self.debug:
+            print(f"[DEBUG] Loaded {len(characters)} characters from index {self.index_path}")
+    
+    def _save_index(self):
+        """Persist the discovery caches atomically for the next run"""
+        index_data = {
+            "version": INDEX_VERSION,
+            "signature": self._cache_signature,
+            "order": [str(char.path) for char in self._characters_cache],
+            "characters": {
+                char_path: {
+                    "fingerprint": fingerprint,
+                    "character": char_info.to_index_record() if char_info else None
+                }
+                for char_path, (fingerprint, char_info) in self._analysis_cache.items()
+            }
+        }
+        
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.index_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(json_dumps(index_data))
+                os.replace(temp_path, self.index_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except Exception as e:
+            print(f"Error saving character index {self.index_path}: {e}")
+    
+    def _is_cache_fresh(self) -> bool:
+        """Check the cached directory mtimes with one stat() per directory, no listings"""
+        if not self._cache_signature:
+            return False
+        
+        for path, mtime_ns in self._cache_signature.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        
+        return True
+    
+    def get_library_signature(self) -> Tuple[Tuple[str, int], ...]:
+        """Get the signature of the library tree recorded by the last discover_characters() call
+        
+        Only directory mtimes are collected: adding, removing or renaming an entry
+        updates its parent directory's mtime, so an unchanged signature means the
+        discovered characters are still valid without re-analyzing them.
+        """
+        with self._discovery_lock:
+            return tuple(self._cache_signature.items())
+    
+    def _walk_library(self):
+        """Yield (path, mtime_ns, character path or None) for every tracked library directory"""
+        for scan_location in self.scan_locations:
+            location = str(scan_location)
+            try:
+                yield location, os.stat(location).st_mtime_ns, None
+            except OSError:
+                continue
+            
+            for session_name, session_path, session_mtime in _list_subdirectories(location):
+                if session_name in SKIP_DIRECTORIES or session_name.startswith('.'):
                     continue
+                yield session_path, session_mtime, None
                 
+                for _, char_path, char_mtime in _list_subdirectories(session_path):
+                    yield char_path, char_mtime, char_path
+                    
+                    for sub_name, sub_path, sub_mtime in _list_subdirectories(char_path):
+                        if sub_name == "ConsistencyTests":
+                            yield sub_path, sub_mtime, char_path
+                        elif sub_name == "Styles":
+                            yield sub_path, sub_mtime, char_path
+                            for _, style_path, style_mtime in _list_subdirectories(sub_path):
+                                yield style_path, style_mtime, char_path
+    
+    def _scan_location(self, location: Path,
+                       fingerprints: Optional[Dict[str, Tuple[Tuple[str, int], ...]]] = None) -> Iterator[CharacterInfo]:
+        """Scan a specific location for characters, yielding them in discovery order
+        
+        fingerprints maps character paths to the mtimes of their directory trees; characters
+        whose fingerprint matches the previous scan are reused without re-analysis.
+        """
+        fingerprints = fingerprints or {}
+        
+        try:
+            candidates = self._find_character_directories(location)
+            results = [None] * len(candidates)
+            
+            pending = []
+            for i, (_, _, char_entry) in enumerate(candidates):
+                fingerprint = fingerprints.get(char_entry.path)
+                cached = self._analysis_cache.get(char_entry.path)
+                if fingerprint and cached and cached[0] == fingerprint:
+                    results[i] = cached[1]
+                else:
+                    pending.append(i)
+            
+            if self.debug:
+                print(f"[DEBUG] Reusing {len(candidates) - len(pending)} unchanged characters, analyzing {len(pending)}")
+            
+            # Analysis is stat/scandir bound, so overlap it across threads
+            max_workers = min(CHARACTER_MANAGEMENT_CONFIG["discovery_max_workers"], len(pending))
+            if max_workers > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    analyzed = list(executor.map(lambda i: self._analyze_candidate(*candidates[i]), pending))
+            else:
+                analyzed = [self._analyze_candidate(*candidates[i]) for i in pending]
+            
+            for i, char_info in zip(pending, analyzed):
+                results[i] = char_info
+                char_path = candidates[i][2].path
+                if char_path in fingerprints:
+                    self._analysis_cache[char_path] = (fingerprints[char_path], char_info)
+        
+        except Exception as e:
+            print(f"Error scanning location {location}: {e}")
+            return
+        
+        for char_info in results:
+            if char_info:
+                yield char_info
+    
+    def _analyze_candidate(self, session_id: str, character_id: str, char_entry: os.DirEntry) -> Optional[CharacterInfo]:
+        """Analyze one discovered character directory, reporting failures instead of raising"""
+        try:
+            char_info = self._analyze_character_directory(session_id, character_id, char_entry)
+            if char_info and self.debug:
+                print(f"[DEBUG] Successfully analyzed character: {character_id} ({char_info.total_images} images)")
+            return char_info
+        except Exception as e:
+            print(f"Error analyzing character {session_id}/{character_id}: {e}")
+            return None
+    
+    def _find_character_directories(self, location: Path) -> List[Tuple[str, str, os.DirEntry]]:
+        """Find (session_id, character_id, entry) for every character directory in a location
+        
+        The location and each session are listed with a single os.scandir pass, whose
+        entries carry the file type, instead of separate glob/iterdir walks per pattern.
+        """
+        standard = []
+        non_standard = []
+        session_count = 0
+        
+        with os.scandir(location) as entries:
+            session_entries = [entry for entry in entries if entry.is_dir()]
+        
+        for session_entry in session_entries:
+            session_id = session_entry.name
+            
+            # Pattern 1: Standard format - Session_*/Char_*
+            if session_id.startswith("Session_"):
                 session_count += 1
-                session_id = session_path.name
                 if self.debug:
                     print(f"[DEBUG] Found session directory: {session_id}")
                 
-                # Look for character directories within session
                 char_count = 0
-                for char_path in session_path.glob("Char_*"):
-                    if not char_path.is_dir():
-                        continue
-                    
-                    char_count += 1
-                    character_id = char_path.name
-                    if self.debug:
-                        print(f"[DEBUG] Found character directory: {session_id}/{character_id}")
-                    
-                    try:
-                        char_info = self._analyze_character_directory(session_id, character_id, char_path)
-                        if char_info:
-                            characters.append(char_info)
-                            if self.debug:
-                                print(f"[DEBUG] Successfully analyzed character: {character_id} ({char_info.total_images} images)")
-                    except Exception as e:
-                        print(f"Error analyzing character {session_id}/{character_id}: {e}")
-                        continue
+                for char_entry in self._scandir_safe(session_entry.path):
+                    if char_entry.name.startswith("Char_") and char_entry.is_dir():
+                        char_count += 1
+                        if self.debug:
+                            print(f"[DEBUG] Found character directory: {session_id}/{char_entry.name}")
+                        standard.append((session_id, char_entry.name, char_entry))
                 
                 if self.debug and char_count == 0:
                     print(f"[DEBUG] No character directories found in {session_id}")
+                continue
             
-            if self.debug:
-                print(f"[DEBUG] Found {session_count} session directories with standard pattern")
+            # Skip system directories
+            if session_id in SKIP_DIRECTORIES or session_id.startswith('.'):
+                continue
             
             # Pattern 2: Non-standard format - numeric directories with character names
-            for potential_session in location.iterdir():
-                if not potential_session.is_dir():
-                    continue
-                
-                # Skip if it matches standard pattern (already processed)
-                if potential_session.name.startswith("Session_"):
-                    continue
-                
-                # Skip system directories
-                if potential_session.name.startswith('.') or potential_session.name in ['__pycache__']:
-                    continue
-                
-                session_id = potential_session.name
-                if self.debug:
-                    print(f"[DEBUG] Checking non-standard directory: {session_id}")
-                
-                # Look for character directories (any subdirectory with character files)
-                for char_path in potential_session.iterdir():
-                    if not char_path.is_dir():
-                        continue
-                    
-                    character_id = char_path.name
-                    
-                    # Check if this looks like a character directory (has base image or metadata)
-                    has_base_image = any(char_path.glob("Base-*.png"))
-                    has_metadata = any(char_path.glob("*metadata.json"))
-                    
-                    if has_base_image or has_metadata:
-                        if self.debug:
-                            print(f"[DEBUG] Found non-standard character: {session_id}/{character_id}")
-                        
-                        try:
-                            char_info = self._analyze_character_directory(session_id, character_id, char_path)
-                            if char_info:
-                                characters.append(char_info)
-                                if self.debug:
-                                    print(f"[DEBUG] Successfully analyzed non-standard character: {character_id} ({char_info.total_images} images)")
-                        except Exception as e:
-                            if self.debug:
-                                print(f"[DEBUG] Error analyzing non-standard character {session_id}/{character_id}: {e}")
-                            continue
-            
-            return characters
+            if self.debug:
+                print(f"[DEBUG] Checking non-standard directory: {session_id}")
             
-        except Exception as e:
-            print(f"Error scanning location {location}: {e}")
+            for char_entry in self._scandir_safe(session_entry.path):
+                # Check if this looks like a character directory (has base image or metadata)
+                if char_entry.is_dir() and self._has_character_files(char_entry.path):
+                    if self.debug:
+                        print(f"[DEBUG] Found non-standard character: {session_id}/{char_entry.name}")
+                    non_standard.append((session_id, char_entry.name, char_entry))
+        
+        if self.debug:
+            print(f"[DEBUG] Found {session_count} session directories with standard pattern")
+        
+        return standard + non_standard
+    
+    def _scandir_safe(self, path: str) -> List[os.DirEntry]:
+        """List a directory's entries, treating an unreadable directory as empty"""
+        try:
+            with os.scandir(path) as entries:
+                return list(entries)
+        except OSError as e:
+            if self.debug:
+                print(f"[DEBUG] Could not list {path}: {e}")
             return []
     
-    def _analyze_character_directory(self, session_id: str, character_id: str, char_path: Path) -> Optional[CharacterInfo]:
+    def _png_names(self, path: str, prefix: str = ""):
+        """Yield the names of PNG images in a directory whose names start with prefix"""
+        for entry in self._scandir_safe(path):
+            name = entry.name
+            if name.endswith(".png") and name.startswith(prefix) and not name.startswith('.'):
+                yield name
+    
+    def _count_pngs(self, path: str, prefix: str = "") -> int:
+        """Count the PNG images in a directory whose names start with prefix"""
+        return sum(1 for _ in self._png_names(path, prefix))
+    
+    def _first_pngs(self, path: str, n: int, prefix: str = "") -> List[str]:
+        """Get paths of the first n PNG images by name without sorting the whole directory"""
+        return [os.path.join(path, name) for name in heapq.nsmallest(n, self._png_names(path, prefix))]
+    
+    def _has_character_files(self, path: str) -> bool:
+        """Check whether a directory holds a base image or metadata file"""
+        # The known file names cover every character this app creates, so try them with stat() first
+        for name in BASE_IMAGE_NAMES + tuple(CHARACTER_MANAGEMENT_CONFIG["metadata_files"]):
+            if os.path.exists(os.path.join(path, name)):
+                return True
+        
+        for entry in self._scandir_safe(path):
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            if (name.startswith("Base-") and name.endswith(".png")) or name.endswith("metadata.json"):
+                return True
+        return False
+    
+    def _analyze_character_directory(self, session_id: str, character_id: str,
+                                     char_entry: os.DirEntry) -> Optional[CharacterInfo]:
         """Analyze a character directory and extract information"""
+        char_path = Path(char_entry.path)
         try:
-            # Get directory creation time
-            creation_date = datetime.fromtimestamp(char_path.stat().st_ctime)
+            # Get directory creation time (DirEntry caches its stat result)
+            creation_ctime = char_entry.stat().st_ctime
             
             # Initialize character info
             char_info = CharacterInfo(
                 session_id=session_id,
                 character_id=character_id,
                 path=char_path,
-                creation_date=creation_date,
+                creation_ctime=creation_ctime,
                 base_image_path=None,
-                base_metadata=None
+                base_metadata_path=None
             )
             
-            # Look for base character image
-            base_image_candidates = [
-                "Base-Character.png",
-                "Base-Image.png"
-            ]
+            # One directory sweep collects base images, metadata files and subdirectories
+            names = set()
+            subdirs = {}
+            for entry in self._scandir_safe(char_entry.path):
+                if entry.is_dir():
+                    subdirs[entry.name] = entry.path
+                else:
+                    names.add(entry.name)
             
-            for candidate in base_image_candidates:
-                base_path = char_path / candidate
-                if base_path.exists():
-                    char_info.base_image_path = base_path
+            # Look for base character image
+            for candidate in BASE_IMAGE_NAMES:
+                if candidate in names:
+                    char_info.base_image_path = char_path / candidate
                     break
             
-            # Load base character metadata
-            base_metadata_path = char_path / "base_character_metadata.json"
-            if not base_metadata_path.exists():
-                base_metadata_path = char_path / "base_image_metadata.json"
-            
-            if base_metadata_path.exists():
-                try:
-                    with open(base_metadata_path, 'r') as f:
-                        char_info.base_metadata = json.load(f)
-                    
-                    # Extract character config and prompt
-                    if char_info.base_metadata:
-                        char_info.prompt = char_info.base_metadata.get('prompt')
-                        if 'parameters' in char_info.base_metadata:
-                            # Try to extract character config from prompt or other metadata
-                            char_info.character_config = {}
-                except Exception as e:
-                    print(f"Error loading base metadata: {e}")
+            # Locate base character metadata (parsed lazily by CharacterInfo.base_metadata)
+            for candidate in CHARACTER_MANAGEMENT_CONFIG["metadata_files"]:
+                if candidate in names:
+                    char_info.base_metadata_path = char_path / candidate
+                    break
             
             # Count realistic variations
-            consistency_path = char_path / "ConsistencyTests"
-            if consistency_path.exists():
-                realistic_images = list(consistency_path.glob("Realistic_*.png"))
-                char_info.realistic_count = len(realistic_images)
+            if "ConsistencyTests" in subdirs:
+                char_info.realistic_count = self._count_pngs(subdirs["ConsistencyTests"], "Realistic_")
             
             # Count styled images
-            styles_path = char_path / "Styles"
-            if styles_path.exists():
-                for style_dir in styles_path.iterdir():
-                    if style_dir.is_dir():
-                        style_name = style_dir.name
-                        styled_images = list(style_dir.glob("*.png"))
-                        char_info.styled_counts[style_name] = len(styled_images)
+            if "Styles" in subdirs:
+                for style_entry in self._scandir_safe(subdirs["Styles"]):
+                    if style_entry.is_dir():
+                        char_info.styled_counts[style_entry.name] = self._count_pngs(style_entry.path)
             
             # Calculate total images
             char_info.total_images = (
-                (1 if char_info.base_image_path and char_info.base_image_path.exists() else 0) +
+                (1 if char_info.base_image_path else 0) +
                 char_info.realistic_count +
                 sum(char_info.styled_counts.values())
             )
@@ -275,18 +547,17 @@ class CharacterManager:
             print(f"Error analyzing character directory {char_path}: {e}")
             return None
     
-    def get_character_by_id(self, session_id: str, character_id: str) -> Optional[CharacterInfo]:
-        """Get specific character by session and character ID"""
-        characters = self.discover_characters()
-        
-        for char in characters:
-            if char.session_id == session_id and char.character_id == character_id:
-                return char
+    def get_character_by_id(self, session_id: str, character_id: str,
+                            refresh: bool = True) -> Optional[CharacterInfo]:
+        """Get specific character by session and character ID (refresh=False skips the freshness check)"""
+        # Refresh the index if the discovery cache has expired
+        if refresh:
+            self.discover_characters()
         
-        return None
+        return self._index.get((session_id, character_id))
     
     def get_character_preview_images(self, char_info: CharacterInfo, max_previews: int = 6) -> List[Tuple[str, str]]:
-        """Get preview images for a character (path, description)"""
+        """Get preview images for a character (path, description), the first as a cached thumbnail"""
         previews = []
         
         try:
@@ -295,28 +566,53 @@ class CharacterManager:
                 previews.append((str(char_info.base_image_path), "Base Character"))
             
             # Add some realistic variations
-            consistency_path = char_info.path / "ConsistencyTests"
-            if consistency_path.exists():
-                realistic_images = sorted(list(consistency_path.glob("Realistic_*.png")))[:3]
-                for i, img_path in enumerate(realistic_images, 1):
-                    previews.append((str(img_path), f"Variation {i}"))
+            if char_info.realistic_count:
+                consistency_path = os.path.join(char_info.path, "ConsistencyTests")
+                for i, img_path in enumerate(self._first_pngs(consistency_path, 3, "Realistic_"), 1):
+                    previews.append((img_path, f"Variation {i}"))
             
             # Add some styled images
-            styles_path = char_info.path / "Styles"
-            if styles_path.exists():
-                for style_name, count in list(char_info.styled_counts.items())[:2]:  # Max 2 styles
-                    style_dir = styles_path / style_name
-                    if style_dir.exists():
-                        style_images = sorted(list(style_dir.glob("*.png")))[:1]  # 1 per style
-                        for img_path in style_images:
-                            previews.append((str(img_path), f"{style_name} Style"))
+            styles_path = os.path.join(char_info.path, "Styles")
+            for style_name, count in list(char_info.styled_counts.items())[:2]:  # Max 2 styles
+                style_dir = os.path.join(styles_path, style_name)
+                for img_path in self._first_pngs(style_dir, 1):  # 1 per style
+                    previews.append((img_path, f"{style_name} Style"))
             
-            return previews[:max_previews]
+            # Only the first preview is shown in the library grid, so only it is thumbnailed
+            previews = previews[:max_previews]
+            if previews:
+                previews[0] = (self._get_cached_thumbnail(Path(previews[0][0])), previews[0][1])
+            return previews
             
         except Exception as e:
             print(f"Error getting preview images: {e}")
             return previews
     
+    def _get_cached_thumbnail(self, image_path: Path) -> str:
+        """Get the cached thumbnail for an image, creating it when missing or stale"""
+        try:
+            source_mtime = image_path.stat().st_mtime_ns
+            digest = hashlib.sha1(str(image_path.resolve()).encode('utf-8')).hexdigest()
+            image_format = CHARACTER_MANAGEMENT_CONFIG["thumbnail_format"]
+            thumb_path = self.thumbnail_dir / f"{digest}.{image_format.lower()}"
+            
+            try:
+                is_fresh = thumb_path.stat().st_mtime_ns >= source_mtime
+            except FileNotFoundError:
+                is_fresh = False
+            
+            if not is_fresh:
+                self.thumbnail_dir.mkdir(parents=True, exist_ok=True)
+                if not create_thumbnail(image_path, thumb_path, CHARACTER_MANAGEMENT_CONFIG["thumbnail_size"],
+                                        image_format, CHARACTER_MANAGEMENT_CONFIG["thumbnail_quality"]):
+                    return str(image_path)
+            
+            return str(thumb_path)
+        
+        except OSError as e:
+            print(f"Error caching thumbnail for {image_path}: {e}")
+            return str(image_path)
+    
     def get_character_statistics(self) -> Dict[str, Any]:
         """Get overall statistics about all characters"""
         characters = self.discover_characters()
@@ -330,29 +626,28 @@ class CharacterManager:
                 "style_breakdown": {}
             }
         
-        total_images = sum(char.total_images for char in characters)
-        sessions = set(char.session_id for char in characters)
-        
-        # Style breakdown
-        style_breakdown = {}
+        # Totals, sessions and style breakdown in a single pass
+        total_images = 0
+        sessions = set()
+        style_breakdown = Counter()
         for char in characters:
-            for style_name, count in char.styled_counts.items():
-                style_breakdown[style_name] = style_breakdown.get(style_name, 0) + count
+            total_images += char.total_images
+            sessions.add(char.session_id)
+            style_breakdown.update(char.styled_counts)
         
-        # Date range
-        dates = [char.creation_date for char in characters]
+        # Date range (discovery returns characters newest first)
         date_range = {
-            "earliest": min(dates).isoformat(),
-            "latest": max(dates).isoformat()
-        } if dates else None
+            "earliest": characters[-1].creation_date.isoformat(),
+            "latest": characters[0].creation_date.isoformat()
+        }
         
         return {
             "total_characters": len(characters),
             "total_images": total_images,
             "total_sessions": len(sessions),
             "creation_date_range": date_range,
-            "style_breakdown": style_breakdown,
-            "average_images_per_character": total_images / len(characters) if characters else 0
+            "style_breakdown": dict(style_breakdown),
+            "average_images_per_character": total_images / len(characters)
         }
     
     def delete_character(self, char_info: CharacterInfo) -> Tuple[bool, str]:
@@ -362,9 +657,8 @@ class CharacterManager:
             
             if char_info.path.exists():
                 shutil.rmtree(char_info.path)
-                
-                # Clear cache to force refresh
-                self._characters_cache = None
+                with self._discovery_lock:
+                    self._forget_character(char_info)
                 
                 return True, f"✅ Character {char_info.character_id} deleted successfully"
             else:
@@ -373,6 +667,29 @@ class CharacterManager:
         except Exception as e:
             return False, f"❌ Error deleting character: {str(e)}"
     
+    def _forget_character(self, char_info: CharacterInfo):
+        """Drop a deleted character from the cache without invalidating the others"""
+        if self._characters_cache is None:
+            return
+        
+        char_key = (char_info.session_id, char_info.character_id)
+        self._index.pop(char_key, None)
+        self._characters_cache = [char for char in self._characters_cache
+                                  if (char.session_id, char.character_id) != char_key]
+        
+        # Stop tracking the removed tree and re-record its session's mtime
+        char_path = str(char_info.path)
+        char_prefix = char_path + os.sep
+        self._cache_signature = {path: mtime for path, mtime in self._cache_signature.items()
+                                 if path != char_path and not path.startswith(char_prefix)}
+        
+        session_path = os.path.dirname(char_path)
+        if session_path in self._cache_signature:
+            try:
+                self._cache_signature[session_path] = os.stat(session_path).st_mtime_ns
+            except OSError:
+                self._cache_signature = {}
+    
     def refresh_characters(self) -> List[CharacterInfo]:
         """Force refresh character list"""
         return self.discover_characters(force_refresh=True)
\ No newline at end of file
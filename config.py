@@ -1,22 +1,25 @@
 """Configuration settings for the Character Creation System"""
 
+import os
+import tempfile
 import zipfile
+from types import MappingProxyType
 from typing import Dict, List, Any
 from dataclasses import dataclass
 
 # Character configuration options
-CHARACTER_ETHNICITIES = ["Asian", "Caucasian", "African", "Hispanic", "Middle Eastern", "Native American", "Mixed"]
-CHARACTER_GENDERS = ["Male", "Female", "Non-binary"]
-HAIR_COLORS = ["Black", "Brown", "Blonde", "Red", "Gray", "White", "Auburn", "Strawberry Blonde"]
-EYE_COLORS = ["Brown", "Blue", "Green", "Hazel", "Gray", "Amber"]
-BUILD_TYPES = ["Slim", "Athletic", "Average", "Muscular", "Curvy", "Heavy"]
-HEIGHT_TYPES = ["Short", "Average", "Tall"]
+CHARACTER_ETHNICITIES = ("Asian", "Caucasian", "African", "Hispanic", "Middle Eastern", "Native American", "Mixed")
+CHARACTER_GENDERS = ("Male", "Female", "Non-binary")
+HAIR_COLORS = ("Black", "Brown", "Blonde", "Red", "Gray", "White", "Auburn", "Strawberry Blonde")
+EYE_COLORS = ("Brown", "Blue", "Green", "Hazel", "Gray", "Amber")
+BUILD_TYPES = ("Slim", "Athletic", "Average", "Muscular", "Curvy", "Heavy")
+HEIGHT_TYPES = ("Short", "Average", "Tall")
 
 # Age ranges for dropdown
-AGE_RANGES = ["18-25", "26-35", "36-45", "46-55", "56-65", "65+"]
+AGE_RANGES = ("18-25", "26-35", "36-45", "46-55", "56-65", "65+")
 
 # Clothing options
-CLOTHING_STYLES = [
+CLOTHING_STYLES = (
     "Casual jeans and t-shirt",
     "Business casual",
     "Formal suit",
@@ -25,7 +28,7 @@ CLOTHING_STYLES = [
     "Bohemian style",
     "Vintage clothing",
     "Modern streetwear"
-]
+)
 
 # API Configuration
 @dataclass
@@ -80,7 +83,7 @@ STYLE_CONFIGS = {
 }
 
 # Default consistency test prompts
-DEFAULT_TEST_PROMPTS = [
+DEFAULT_TEST_PROMPTS = (
     "Character sitting on a chair, same appearance",
     "Character walking forward, confident pose",
     "Character waving hello, friendly expression",
@@ -111,10 +114,10 @@ DEFAULT_TEST_PROMPTS = [
     "Character from behind, looking over shoulder",
     "Character full body from slight distance",
     "Character in three-quarter view angle"
-]
+)
 
 # UI Configuration
-UI_CONFIG = {
+UI_CONFIG = MappingProxyType({
     "title": "🎨 AI Character Creation Studio",
     "description": "Create consistent character images using Imagen 4, Kontext Max, and style LoRAs",
     "theme_colors": {
@@ -123,32 +126,46 @@ UI_CONFIG = {
         "accent": "#20B2AA"     # Light sea green
     },
     "gallery_columns": 4,
-    "max_batch_size": 10
-}
+    "max_batch_size": 10,
+    "queue_concurrency_limit": 8,  # Concurrent runs per event handler
+    "queue_max_size": 64           # Requests allowed to wait in the queue
+})
 
 # Debug and Performance Configuration
-DEBUG_CONFIG = {
+DEBUG_CONFIG = MappingProxyType({
     "default_debug_mode": False,
     "log_api_requests": True,
     "log_api_responses": True,
     "show_timing_info": True,
     "detailed_error_messages": True
-}
+})
 
 # Timeout Configuration (in seconds)
-TIMEOUT_CONFIG = {
+TIMEOUT_CONFIG = MappingProxyType({
     "imagen4_timeout": 120,      # 2 minutes for base character generation
     "kontext_max_timeout": 300,  # 5 minutes per variation
     "kontext_lora_timeout": 240, # 4 minutes per style transfer
     "download_timeout": 60,      # 1 minute for image downloads
     "total_session_timeout": 36000 # 10 hours for entire session
-}
+})
+
+# Concurrency Configuration
+CONCURRENCY_CONFIG = MappingProxyType({
+    "max_concurrent_requests": 5,       # Parallel FAL API calls per variation batch
+    "max_concurrent_style_requests": 8, # Parallel FAL API calls per style transfer batch
+    "max_concurrent_downloads": 8       # Parallel result downloads, overlapped with API calls
+})
 
 # Character Management Configuration
-CHARACTER_MANAGEMENT_CONFIG = {
+CHARACTER_MANAGEMENT_CONFIG = MappingProxyType({
     "cache_duration_seconds": 30,  # How long to cache character discovery results
+    "discovery_max_workers": 16,   # Threads analyzing character directories during discovery
     "max_preview_images": 6,       # Maximum preview images per character
     "thumbnail_size": (200, 200),  # Thumbnail dimensions for preview
+    "thumbnail_cache_dir": os.path.join(tempfile.gettempdir(), "character_thumbnails"),  # Persistent preview thumbnails
+    "thumbnail_format": "WEBP",    # Preview thumbnail encoding (WEBP or JPEG)
+    "thumbnail_quality": 80,
+    "index_cache_dir": os.path.join(tempfile.gettempdir(), "character_index"),  # Discovery results reused across restarts
     "supported_image_formats": [".png", ".jpg", ".jpeg"],
     "metadata_files": [
         "base_character_metadata.json",
@@ -160,21 +177,25 @@ CHARACTER_MANAGEMENT_CONFIG = {
         "consistency": "ConsistencyTests",
         "styles": "Styles"
     }
-}
+})
 
 # ZIP Export Configuration  
-ZIP_EXPORT_CONFIG = {
+ZIP_EXPORT_CONFIG = MappingProxyType({
     "compression_level": zipfile.ZIP_DEFLATED,
+    "image_compression": zipfile.ZIP_STORED,    # PNG/JPEG are already compressed
+    "text_compression": zipfile.ZIP_DEFLATED,   # JSON, JSONL and README members
+    "text_compresslevel": 1,                    # Fast deflate; metadata is small and repetitive
     "include_metadata_by_default": True,
     "estimated_compression_ratio": 0.7,  # 70% of original size
     "temp_file_cleanup": True,
     "readme_template": "character_export_readme.txt",
     "batch_size_warning_mb": 100,  # Warn if batch ZIP exceeds this size
-    "max_characters_per_batch": 50
-}
+    "max_characters_per_batch": 50,
+    "max_workers": None  # Threads reading characters for batch ZIPs (None = CPU count)
+})
 
 # Library Display Configuration
-LIBRARY_DISPLAY_CONFIG = {
+LIBRARY_DISPLAY_CONFIG = MappingProxyType({
     "characters_per_page": 20,
     "gallery_columns": 3,
     "preview_image_size": (300, 300),
@@ -182,4 +203,4 @@ LIBRARY_DISPLAY_CONFIG = {
     "show_image_counts": True,
     "auto_refresh_interval": None,  # Set to seconds for auto-refresh, None to disable
     "sort_options": ["date_desc", "date_asc", "name_asc", "image_count_desc"]
-}
\ No newline at end of file
+})
\ No newline at end of file
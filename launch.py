@@ -7,6 +7,7 @@ This script provides a simple way to start the application with proper error han
 
 import os
 import sys
+import importlib.util
 from pathlib import Path
 
 def check_environment():
@@ -23,11 +24,11 @@ def check_environment():
     required_modules = ['gradio', 'fal_client', 'requests', 'PIL', 'matplotlib']
     missing_modules = []
     
+    # find_spec only locates each module, so the check does not pay their import time
     for module in required_modules:
-        try:
-            __import__(module)
+        if importlib.util.find_spec(module) is not None:
             print(f"OK: {module}")
-        except ImportError:
+        else:
             missing_modules.append(module)
             print(f"ERROR: {module}")
     
@@ -79,8 +80,8 @@ def main():
     
     try:
         # Import and launch the app
-        from app import app
-        app.launch(
+        from app import launch_app
+        launch_app(
             server_name="0.0.0.0",
             server_port=7860,
             share=False,
@@ -1,16 +1,79 @@
 """Utility functions for the Character Creation System"""
 
 import os
-import requests
-import base64
+import re
+import mmap
+import mimetypes
+import importlib
 import json
 import time
+import shutil
+import struct
+import threading
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple
-from PIL import Image
+from typing import Dict, Any, List, Optional, Tuple, Union, BinaryIO, TYPE_CHECKING
 from io import BytesIO
-import fal_client
+
+from config import CONCURRENCY_CONFIG
+
+if TYPE_CHECKING:
+    import requests
+    from PIL import Image
+
+# Heavy third-party modules are imported where they are used, so importing utils stays cheap;
+# module attribute access (utils.requests, utils.Image, utils.fal_client) loads them on demand
+_LAZY_IMPORTS = {
+    "requests": "requests",
+    "Image": "PIL.Image",
+    "fal_client": "fal_client"
+}
+
+def __getattr__(name: str) -> Any:
+    """Import heavy dependencies on first attribute access (PEP 562)"""
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name])
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Use the SIMD-accelerated pybase64 drop-in if installed
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Use the faster orjson serializer for metadata files if installed (both produce UTF-8 bytes)
+try:
+    import orjson
+    
+    def _dump_metadata(metadata: Dict[str, Any]) -> bytes:
+        return orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    
+    def _dump_metadata_line(metadata: Dict[str, Any]) -> bytes:
+        return orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    def _dump_metadata(metadata: Dict[str, Any]) -> bytes:
+        return json.dumps(metadata, indent=2).encode('utf-8')
+    
+    def _dump_metadata_line(metadata: Dict[str, Any]) -> bytes:
+        return (json.dumps(metadata) + "\n").encode('utf-8')
+
+# Leading bytes of the image formats PIL is expected to handle (WEBP is RIFF....WEBP)
+IMAGE_MIME_TYPES = {
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'GIF87a': 'image/gif',
+    b'GIF89a': 'image/gif',
+    b'BM': 'image/bmp',
+    b'II*\x00': 'image/tiff',
+    b'MM\x00*': 'image/tiff',
+}
+IMAGE_SIGNATURES = tuple(IMAGE_MIME_TYPES)
+
+# Runs of characters invalid in filenames, together with underscores, collapse to one underscore
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*_]+')
 
 # Load environment variables from .env file
 try:
@@ -20,19 +83,50 @@ except ImportError:
     # dotenv not installed, skip loading
     pass
 
+# Shared HTTP session so image downloads reuse keep-alive connections across all stages
+_http_session: Optional['requests.Session'] = None
+_http_session_lock = threading.Lock()
+
+def _get_http_session() -> 'requests.Session':
+    """Get the shared HTTP session, creating it on first use"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                
+                # Pool enough keep-alive connections for every concurrent download (at least the default 10)
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=max(10, CONCURRENCY_CONFIG["max_concurrent_downloads"])
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
 def create_session_folder(session_id: str, character_id: str) -> Tuple[Path, Path]:
     """Create organized folder structure for session outputs"""
     base_path = Path(session_id) / character_id
     consistency_path = base_path / "ConsistencyTests"
     styles_path = base_path / "Styles"
     
-    # Create directories
-    base_path.mkdir(parents=True, exist_ok=True)
+    # Create directories (parents=True creates base_path along with the first subfolder)
     consistency_path.mkdir(parents=True, exist_ok=True)
-    styles_path.mkdir(parents=True, exist_ok=True)
+    styles_path.mkdir(exist_ok=True)
     
     return base_path, consistency_path
 
+# Fixed tail of every character prompt
+PROMPT_PHOTOGRAPHY_REQUIREMENTS = (
+    "full body image",
+    "plain white background",
+    "professional studio lighting",
+    "high quality",
+    "detailed",
+    "realistic"
+)
+
 def build_character_prompt(config: Dict[str, Any]) -> str:
     """Build comprehensive character generation prompt"""
     prompt_parts = [
@@ -47,61 +141,89 @@ def build_character_prompt(config: Dict[str, Any]) -> str:
         prompt_parts.append(f"with {config['facial_features']}")
     
     # Photography requirements
-    prompt_parts.extend([
-        "full body image",
-        "plain white background",
-        "professional studio lighting",
-        "high quality",
-        "detailed",
-        "realistic"
-    ])
+    prompt_parts.extend(PROMPT_PHOTOGRAPHY_REQUIREMENTS)
     
     return ", ".join(prompt_parts)
 
 def save_image_from_url(url: str, filepath: Path, max_retries: int = 3) -> bool:
     """Download and save image from URL with retry logic"""
+    # Stream into a side file and rename it into place, so an interrupted download
+    # never leaves a truncated image at the final path
+    part_path = f"{filepath}.part"
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            # Stream the body straight to disk instead of buffering the whole image in memory
+            with _get_http_session().get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                
+                with open(part_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, 1 << 20)
             
+            os.replace(part_path, filepath)
             return True
         except Exception as e:
             if attempt == max_retries - 1:
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
                 print(f"Failed to save {filepath} after {max_retries} attempts: {e}")
                 return False
             time.sleep(1)  # Wait before retry
     
     return False
 
-def convert_image_to_base64(image_path: Path) -> Optional[str]:
+def _encode_file_base64(path: Union[str, Path]) -> Tuple[bytes, bytes]:
+    """Base64-encode a file straight from a read-only memory map, without an extra bytes copy
+    
+    Returns the file's first 12 bytes (enough to sniff its format) and the encoded contents.
+    """
+    with open(path, "rb") as image_file:
+        try:
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:12], base64.b64encode(mapped)
+        except ValueError:
+            # Empty files cannot be mapped
+            data = image_file.read()
+            return data[:12], base64.b64encode(data)
+
+# Data URLs of full-size images are several MB each, so only keep the last few
+@lru_cache(maxsize=4)
+def _encode_data_url(path: str, mtime_ns: int, size: int) -> str:
+    """Encode an image file as a data URL, cached per file version (mtime and size are part of the key)"""
+    header, encoded = _encode_file_base64(path)
+    # Trust the file's contents over its extension
+    mime_type = _sniff_image_mime(header) or mimetypes.guess_type(path)[0] or "image/png"
+    return f"data:{mime_type};base64," + encoded.decode('ascii')
+
+def _cached_data_url(image_path: Union[str, Path]) -> str:
+    """Get the data URL for the current version of an image file from the encoding cache"""
+    stat = os.stat(image_path)
+    return _encode_data_url(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+def convert_image_to_base64(image_path: Union[str, Path]) -> Optional[str]:
     """Convert image file to base64 string"""
     try:
-        with open(image_path, "rb") as image_file:
-            base64_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return base64_string
+        # Shares the data URL cache, so a file is only read and encoded once
+        return _cached_data_url(image_path).partition(',')[2]
     except Exception as e:
         print(f"Failed to convert {image_path} to base64: {e}")
         return None
 
-def convert_image_to_data_url(image_path: Path) -> Optional[str]:
+def convert_image_to_data_url(image_path: Union[str, Path]) -> Optional[str]:
     """Convert image file to base64 data URL for API usage"""
     try:
-        with open(image_path, "rb") as image_file:
-            base64_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return f"data:image/png;base64,{base64_string}"
+        return _cached_data_url(image_path)
     except Exception as e:
         print(f"Failed to convert {image_path} to data URL: {e}")
         return None
 
 def create_metadata_entry(prompt: str, params: Dict[str, Any], result: Dict[str, Any], 
-                         image_path: Optional[Path] = None) -> Dict[str, Any]:
-    """Create metadata entry for generated image"""
+                         image_path: Optional[Path] = None, timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """Create metadata entry for generated image (timestamp defaults to now)"""
     return {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": timestamp or datetime.now().isoformat(),
         "prompt": prompt,
         "parameters": params,
         "result": result,
@@ -112,15 +234,31 @@ def create_metadata_entry(prompt: str, params: Dict[str, Any], result: Dict[str,
 def save_metadata(metadata: Dict[str, Any], filepath: Path) -> None:
     """Save metadata to JSON file"""
     try:
-        with open(filepath, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Serialize up front and write in one call, so an unserializable entry
+        # never leaves a truncated file behind
+        data = _dump_metadata(metadata)
+        with open(filepath, 'wb') as f:
+            f.write(data)
     except Exception as e:
         print(f"Failed to save metadata to {filepath}: {e}")
 
+def append_metadata_line(metadata_log: BinaryIO, metadata: Dict[str, Any]) -> None:
+    """Append metadata as one line to a JSONL log opened in binary mode"""
+    try:
+        # Serialized before writing, so a bad entry never leaves a partial line
+        metadata_log.write(_dump_metadata_line(metadata))
+    except Exception as e:
+        print(f"Failed to append metadata to {metadata_log.name}: {e}")
+
 def validate_api_key() -> Tuple[bool, str]:
     """Validate FAL API key and return status message with setup guidance"""
+    return _validate_api_key_value(os.environ.get('FAL_KEY'))
+
+@lru_cache(maxsize=4)
+def _validate_api_key_value(key: Optional[str]) -> Tuple[bool, str]:
+    """Validate a FAL API key value, cached since the key and .env files are fixed after startup"""
     try:
-        if 'FAL_KEY' not in os.environ:
+        if key is None:
             env_file_exists = Path('.env').exists()
             env_example_exists = Path('.env.example').exists()
             
@@ -142,7 +280,6 @@ def validate_api_key() -> Tuple[bool, str]:
             error_msg += "Get your API key from: https://fal.ai/dashboard"
             return False, error_msg
         
-        key = os.environ['FAL_KEY']
         if len(key) < 10:
             return False, "❌ Invalid API key format. Please check your FAL_KEY value."
         
@@ -153,9 +290,10 @@ def validate_api_key() -> Tuple[bool, str]:
     except Exception as e:
         return False, f"❌ API validation failed: {str(e)}"
 
-def resize_image_for_display(image_path: Path, max_size: int = 512) -> Optional[Image.Image]:
+def resize_image_for_display(image_path: Path, max_size: int = 512) -> Optional['Image.Image']:
     """Resize image for display in Gradio while maintaining aspect ratio"""
     try:
+        from PIL import Image
         with Image.open(image_path) as img:
             img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             return img.copy()
@@ -166,6 +304,13 @@ def resize_image_for_display(image_path: Path, max_size: int = 512) -> Optional[
 def get_image_dimensions(image_path: Path) -> Tuple[int, int]:
     """Get image dimensions"""
     try:
+        # PNG stores its size in the IHDR chunk right after the signature, no decoder needed
+        with open(image_path, 'rb') as f:
+            header = f.read(24)
+        if header[:8] == IMAGE_SIGNATURES[0] and header[12:16] == b'IHDR':
+            return struct.unpack('>II', header[16:24])
+        
+        from PIL import Image
         with Image.open(image_path) as img:
             return img.size
     except Exception:
@@ -175,13 +320,29 @@ class APIWrapper:
     """Wrapper class for FAL API calls with enhanced status tracking"""
     
     def __init__(self, debug_mode: bool = False):
+        import fal_client
+        
         self.client = fal_client
         self.debug_mode = debug_mode
         self.current_status = ""
+        self._timestamp_cache = (-1, "")
+        
+        # Queue update handlers, bound once per model instead of redefined on every call
+        self._queue_handlers = {
+            "imagen4": partial(self._log_queue_update, "Imagen4"),
+            "kontext_max": partial(self._log_queue_update, "Kontext Max"),
+            "kontext_lora": partial(self._log_queue_update, "Kontext LoRA")
+        }
     
     def _log_status(self, message: str, level: str = "info"):
-        """Log status message with timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        """Log status message with timestamp (debug messages are only printed in debug mode)"""
+        # Reformat the timestamp only when the second changes; the (second, text)
+        # pair is swapped as one tuple so concurrent callers never see a torn update
+        now = int(time.time())
+        second, timestamp = self._timestamp_cache
+        if second != now:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(now))
+            self._timestamp_cache = (now, timestamp)
         formatted_msg = f"[{timestamp}] {message}"
         
         if level == "debug" and not self.debug_mode:
@@ -191,6 +352,24 @@ class APIWrapper:
         self.current_status = formatted_msg
         return formatted_msg
     
+    def _log_queue_update(self, model_name: str, update: Any):
+        """Log the progress messages of an in-progress FAL queue update"""
+        if isinstance(update, self.client.InProgress):
+            for log in update.logs:
+                self._log_status(f"📝 {model_name}: {log['message']}")
+    
+    def upload_image(self, image_path: Path) -> Optional[str]:
+        """Upload an image to FAL storage, returning its URL (None if the upload fails)"""
+        start_time = time.time()
+        
+        try:
+            url = self.client.upload_file(str(image_path))
+            self._log_status(f"📤 Uploaded {Path(image_path).name} in {time.time() - start_time:.1f}s", "debug")
+            return url
+        except Exception as e:
+            self._log_status(f"⚠️ Upload of {Path(image_path).name} failed, sending it inline instead: {e}")
+            return None
+    
     def call_imagen4(self, prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Call Imagen 4 API with detailed status tracking"""
         start_time = time.time()
@@ -202,20 +381,13 @@ class APIWrapper:
             if self.debug_mode:
                 self._log_status(f"Request params: {request}", "debug")
             
-            # Define queue update handler for Imagen 4
-            def on_imagen4_queue_update(update):
-                if isinstance(update, fal_client.InProgress):
-                    for log in update.logs:
-                        status_msg = f"📝 Imagen4: {log['message']}"
-                        self._log_status(status_msg)
-            
             self._log_status("⏳ Submitting request to Imagen 4...")
             
             result = self.client.subscribe(
                 "fal-ai/imagen4/preview/fast",
                 arguments=request,
                 with_logs=True,
-                on_queue_update=on_imagen4_queue_update
+                on_queue_update=self._queue_handlers["imagen4"]
             )
             
             elapsed_time = time.time() - start_time
@@ -262,20 +434,13 @@ class APIWrapper:
                 self._log_status(f"Image URL length: {len(image_url)} chars", "debug")
                 self._log_status(f"Request params: {params}", "debug")
             
-            # Define queue update handler for Kontext Max
-            def on_kontext_queue_update(update):
-                if isinstance(update, fal_client.InProgress):
-                    for log in update.logs:
-                        status_msg = f"📝 Kontext Max: {log['message']}"
-                        self._log_status(status_msg)
-            
             self._log_status("⏳ Submitting request to Kontext Max...")
             
             result = self.client.subscribe(
                 "fal-ai/flux-pro/kontext/max",
                 arguments=request,
                 with_logs=True,
-                on_queue_update=on_kontext_queue_update
+                on_queue_update=self._queue_handlers["kontext_max"]
             )
             
             elapsed_time = time.time() - start_time
@@ -328,20 +493,13 @@ class APIWrapper:
                 self._log_status(f"Image URL length: {len(image_url)} chars", "debug")
                 self._log_status(f"Request params: {params}", "debug")
             
-            # Define queue update handler for Kontext LoRA
-            def on_lora_queue_update(update):
-                if isinstance(update, fal_client.InProgress):
-                    for log in update.logs:
-                        status_msg = f"📝 Kontext LoRA: {log['message']}"
-                        self._log_status(status_msg)
-            
             self._log_status("⏳ Submitting request to Kontext LoRA...")
             
             result = self.client.subscribe(
                 "fal-ai/flux-kontext-lora",
                 arguments=request,
                 with_logs=True,
-                on_queue_update=on_lora_queue_update
+                on_queue_update=self._queue_handlers["kontext_lora"]
             )
             
             elapsed_time = time.time() - start_time
@@ -375,45 +533,79 @@ def format_progress_message(current: int, total: int, operation: str) -> str:
     percentage = (current / total) * 100 if total > 0 else 0
     return f"{operation}: {current}/{total} ({percentage:.1f}%)"
 
+def _iter_files(directory: Union[str, Path]):
+    """Recursively yield DirEntry objects for files under a directory (symlinked directories are not followed)"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file():
+                yield entry
+
 def cleanup_temp_files(directory: Path, max_age_hours: int = 24) -> None:
     """Clean up temporary files older than specified hours"""
     try:
-        current_time = time.time()
-        for file_path in directory.rglob("*"):
-            if file_path.is_file():
-                file_age = current_time - file_path.stat().st_mtime
-                if file_age > (max_age_hours * 3600):
-                    file_path.unlink()
+        cutoff = time.time() - max_age_hours * 3600
+        for entry in _iter_files(directory):
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
     except Exception as e:
         print(f"Cleanup failed: {e}")
 
-def validate_image_file(file_path: Path) -> bool:
-    """Validate if file is a valid image"""
+def _sniff_image_mime(header: bytes) -> Optional[str]:
+    """Get the MIME type of an image from its leading bytes, or None for unknown formats"""
+    if header.startswith(b'RIFF'):
+        return 'image/webp' if header[8:12] == b'WEBP' else None
+    for signature, mime_type in IMAGE_MIME_TYPES.items():
+        if header.startswith(signature):
+            return mime_type
+    return None
+
+def _has_image_signature(header: bytes) -> bool:
+    """Check a file's leading bytes against known image format signatures"""
+    return _sniff_image_mime(header) is not None
+
+def validate_image_file(file_path: Path, deep: bool = True) -> bool:
+    """Validate if file is a valid image (deep=False only checks the format signature)"""
     try:
+        # The quick check only knows common formats; a deep check lets PIL decide for any format
+        if not deep:
+            with open(file_path, 'rb') as f:
+                return _has_image_signature(f.read(12))
+        
+        from PIL import Image
         with Image.open(file_path) as img:
             img.verify()
         return True
     except Exception:
         return False
 
-def create_thumbnail(image_path: Path, output_path: Path, size: Tuple[int, int] = (200, 200)) -> bool:
-    """Create a thumbnail of an image"""
+def create_thumbnail(image_path: Path, output_path: Path, size: Tuple[int, int] = (200, 200),
+                     image_format: str = "JPEG", quality: int = 85) -> bool:
+    """Create a thumbnail of an image (JPEG or WEBP)"""
     try:
+        from PIL import Image
         with Image.open(image_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
+            # Palette images must be expanded first, they only resize with nearest-neighbour
+            if img.mode == 'P':
+                img = img.convert('RGBA')
             
             # Create thumbnail maintaining aspect ratio
             img.thumbnail(size, Image.Resampling.LANCZOS)
             
-            # Save as JPEG for smaller file size
-            img.save(output_path, 'JPEG', quality=85, optimize=True)
+            # Convert to RGB if necessary (for PNG with transparency), at thumbnail size
+            if img.mode in ('RGBA', 'LA'):
+                # Create white background
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                # getchannel extracts only the alpha band; split() would copy every band
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            
+            # Save in a compressed format for smaller file size
+            if image_format.upper() == 'WEBP':
+                img.save(output_path, 'WEBP', quality=quality, method=4)
+            else:
+                img.save(output_path, image_format, quality=quality, optimize=True)
             return True
     except Exception as e:
         print(f"Error creating thumbnail for {image_path}: {e}")
@@ -421,40 +613,45 @@ def create_thumbnail(image_path: Path, output_path: Path, size: Tuple[int, int]
 
 def get_image_info(image_path: Path) -> Dict[str, Any]:
     """Get comprehensive image information"""
+    # One stat() serves both the success and the error result
     try:
+        file_size = os.stat(image_path).st_size
+    except OSError:
+        file_size = 0
+    
+    try:
+        from PIL import Image
+        # Only header fields are read; the pixel data is never loaded
         with Image.open(image_path) as img:
             return {
                 "width": img.width,
                 "height": img.height,
                 "mode": img.mode,
                 "format": img.format,
-                "file_size": image_path.stat().st_size,
-                "file_size_mb": image_path.stat().st_size / (1024 * 1024)
+                "file_size": file_size,
+                "file_size_mb": file_size / (1024 * 1024)
             }
     except Exception as e:
         return {
             "error": str(e),
-            "file_size": image_path.stat().st_size if image_path.exists() else 0
+            "file_size": file_size
         }
 
+# (divisor, unit) for each power of 1024, indexed by bit_length // 10
+_SIZE_UNITS = ((1, "bytes"), (1 << 10, "KB"), (1 << 20, "MB"), (1 << 30, "GB"))
+
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
-    if size_bytes >= 1024 * 1024 * 1024:  # GB
-        return f"{size_bytes / (1024**3):.1f} GB"
-    elif size_bytes >= 1024 * 1024:  # MB
-        return f"{size_bytes / (1024**2):.1f} MB"
-    elif size_bytes >= 1024:  # KB
-        return f"{size_bytes / 1024:.1f} KB"
-    else:
+    if size_bytes < 1024:
         return f"{size_bytes} bytes"
+    # Every 10 bits is one unit step, so bit_length selects the unit without a comparison chain
+    divisor, unit = _SIZE_UNITS[min((int(size_bytes).bit_length() - 1) // 10, 3)]
+    return f"{size_bytes / divisor:.1f} {unit}"
 
 def safe_filename(filename: str) -> str:
     """Create a safe filename by removing invalid characters"""
-    import re
-    # Remove invalid characters for filenames
-    safe_name = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Remove multiple underscores
-    safe_name = re.sub(r'_+', '_', safe_name)
+    # Replace invalid characters and collapse multiple underscores in one pass
+    safe_name = _UNSAFE_FILENAME_RE.sub('_', filename)
     # Trim underscores from ends
     safe_name = safe_name.strip('_')
     return safe_name or "unnamed"
\ No newline at end of file
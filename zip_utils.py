@@ -1,87 +1,103 @@
 """ZIP utilities for character downloading and packaging"""
 
 import os
-import json
+import io
+import sys
+import mmap
+import shutil
+import zlib
 import zipfile
 import tempfile
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional, Generator
+from typing import List, Dict, Any, Tuple, Optional, Generator, BinaryIO
 from datetime import datetime
-import shutil
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
+from config import ZIP_EXPORT_CONFIG
 from character_manager import CharacterInfo
+from utils import _dump_metadata
+
+# Use the SIMD-accelerated ISA-L deflate and CRC-32 (PCLMULQDQ) for ZIP members if installed;
+# both produce the same output as zlib
+try:
+    from isal import isal_zlib as deflate_zlib
+except ImportError:
+    deflate_zlib = zlib
+
+# Already-compressed formats gain nothing from deflate, so they are stored as-is
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+# Chunk size for checksumming and copying stored files
+COPY_BUFFER_SIZE = 1 << 20
+
+# Write buffer for archive files, so headers and small members reach the OS in large writes
+ARCHIVE_BUFFER_SIZE = 1 << 20
+
+# Files at least this large are checksummed through mmap; below it the mapping costs more than it saves
+MMAP_THRESHOLD = 64 * 1024
+
+# Linux can copy stored files into the archive in-kernel (macOS sendfile only writes to sockets)
+USE_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+# Metadata files exported alongside images (per-image metadata lives in JSONL logs)
+METADATA_SUFFIXES = (".json", ".jsonl")
+
+def _supports_raw_members() -> bool:
+    """Check that ZipFile has the internals _append_prepared_member mirrors (CPython 3.8-3.13)"""
+    if sys.version_info >= (3, 14):
+        return False
+    with zipfile.ZipFile(io.BytesIO(), 'w') as probe:
+        return (all(hasattr(probe, name) for name in ("_lock", "_writecheck", "_didModify", "fp", "start_dir"))
+                and hasattr(zipfile.ZipInfo, "FileHeader") and hasattr(zipfile, "_get_compressor"))
+
+# Members compressed in worker threads are appended through undocumented ZipFile internals,
+# so only on the versions checked above; elsewhere ZipFile compresses them itself
+RAW_MEMBER_WRITES = _supports_raw_members()
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write-only stream collecting ZIP output for the stream_* generators"""
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = deque()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        """Take everything written since the last drain"""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
 
 class CharacterZipper:
     """Handles ZIP creation and packaging for characters"""
     
     def __init__(self):
         self.temp_dir = None
+        # {character path: (directory mtimes, file inventory)} shared by size estimates and exports
+        self._inventory_cache = {}
     
     def create_character_zip(self, char_info: CharacterInfo, 
                            include_metadata: bool = True) -> Tuple[bool, str, Optional[str]]:
         """Create a ZIP file for a single character"""
         try:
-            # Create temporary file for ZIP
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Create temporary file for ZIP; one export time names it and dates its contents
+            export_time = datetime.now()
+            timestamp = export_time.strftime("%Y%m%d_%H%M%S")
             zip_filename = f"{char_info.character_id}_{timestamp}.zip"
             
-            # Create temporary ZIP file
-            temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-            temp_zip_path = temp_zip.name
-            temp_zip.close()
-            
-            with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add base character image
-                if char_info.base_image_path and char_info.base_image_path.exists():
-                    zipf.write(char_info.base_image_path, char_info.base_image_path.name)
-                
-                # Add base metadata
-                if include_metadata and char_info.base_metadata:
-                    metadata_json = json.dumps(char_info.base_metadata, indent=2)
-                    zipf.writestr("base_character_metadata.json", metadata_json)
-                
-                # Add consistency test images
-                consistency_path = char_info.path / "ConsistencyTests"
-                if consistency_path.exists():
-                    for img_file in consistency_path.glob("*.png"):
-                        arcname = f"ConsistencyTests/{img_file.name}"
-                        zipf.write(img_file, arcname)
-                    
-                    # Add consistency metadata files
-                    if include_metadata:
-                        for meta_file in consistency_path.glob("*.json"):
-                            arcname = f"ConsistencyTests/{meta_file.name}"
-                            zipf.write(meta_file, arcname)
-                
-                # Add styled images
-                styles_path = char_info.path / "Styles"
-                if styles_path.exists():
-                    for style_dir in styles_path.iterdir():
-                        if style_dir.is_dir():
-                            style_name = style_dir.name
-                            
-                            # Add styled images
-                            for img_file in style_dir.glob("*.png"):
-                                arcname = f"Styles/{style_name}/{img_file.name}"
-                                zipf.write(img_file, arcname)
-                            
-                            # Add style metadata
-                            if include_metadata:
-                                for meta_file in style_dir.glob("*.json"):
-                                    arcname = f"Styles/{style_name}/{meta_file.name}"
-                                    zipf.write(meta_file, arcname)
-                
-                # Create comprehensive character summary
-                if include_metadata:
-                    summary = self._create_character_summary(char_info)
-                    zipf.writestr("character_summary.json", json.dumps(summary, indent=2))
-                    
-                    # Create README
-                    readme_content = self._create_readme(char_info)
-                    zipf.writestr("README.txt", readme_content)
+            # Write the ZIP straight into the open temporary file
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip', buffering=ARCHIVE_BUFFER_SIZE) as temp_zip:
+                temp_zip_path = temp_zip.name
+                self.create_character_zip_stream(char_info, temp_zip, include_metadata, export_time)
+                file_size = temp_zip.tell()
             
-            # Get file size
-            file_size = os.path.getsize(temp_zip_path)
             size_mb = file_size / (1024 * 1024)
             
             success_msg = f"✅ ZIP created successfully: {zip_filename} ({size_mb:.1f} MB)"
@@ -90,6 +106,19 @@ class CharacterZipper:
         except Exception as e:
             return False, f"❌ Error creating ZIP: {str(e)}", None
     
+    def create_character_zip_stream(self, char_info: CharacterInfo, fileobj: BinaryIO,
+                                  include_metadata: bool = True,
+                                  export_time: Optional[datetime] = None) -> None:
+        """Write a single character's ZIP into a binary file object (file, spooled temp file or response stream)"""
+        for _ in self._write_character_zip(char_info, fileobj, include_metadata, export_time):
+            pass
+    
+    def stream_character_zip(self, char_info: CharacterInfo,
+                           include_metadata: bool = True) -> Generator[bytes, None, None]:
+        """Yield a single character's ZIP in chunks as each file is added (e.g. for a streaming HTTP response)"""
+        sink = _ChunkSink()
+        return self._drain_zip_writer(self._write_character_zip(char_info, sink, include_metadata, None), sink)
+    
     def create_batch_zip(self, characters: List[CharacterInfo], 
                         include_metadata: bool = True) -> Tuple[bool, str, Optional[str]]:
         """Create a ZIP file containing multiple characters"""
@@ -97,76 +126,17 @@ class CharacterZipper:
             if not characters:
                 return False, "❌ No characters selected", None
             
-            # Create ZIP filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Create ZIP filename; one export time names it and dates its contents
+            export_time = datetime.now()
+            timestamp = export_time.strftime("%Y%m%d_%H%M%S")
             zip_filename = f"Characters_Batch_{timestamp}.zip"
             
-            # Create temporary ZIP file
-            temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-            temp_zip_path = temp_zip.name
-            temp_zip.close()
-            
-            with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                
-                # Add each character in its own folder
-                for char_info in characters:
-                    char_folder = f"{char_info.session_id}_{char_info.character_id}"
-                    
-                    # Add base character image
-                    if char_info.base_image_path and char_info.base_image_path.exists():
-                        arcname = f"{char_folder}/{char_info.base_image_path.name}"
-                        zipf.write(char_info.base_image_path, arcname)
-                    
-                    # Add base metadata
-                    if include_metadata and char_info.base_metadata:
-                        metadata_json = json.dumps(char_info.base_metadata, indent=2)
-                        zipf.writestr(f"{char_folder}/base_character_metadata.json", metadata_json)
-                    
-                    # Add consistency test images
-                    consistency_path = char_info.path / "ConsistencyTests"
-                    if consistency_path.exists():
-                        for img_file in consistency_path.glob("*.png"):
-                            arcname = f"{char_folder}/ConsistencyTests/{img_file.name}"
-                            zipf.write(img_file, arcname)
-                        
-                        if include_metadata:
-                            for meta_file in consistency_path.glob("*.json"):
-                                arcname = f"{char_folder}/ConsistencyTests/{meta_file.name}"
-                                zipf.write(meta_file, arcname)
-                    
-                    # Add styled images
-                    styles_path = char_info.path / "Styles"
-                    if styles_path.exists():
-                        for style_dir in styles_path.iterdir():
-                            if style_dir.is_dir():
-                                style_name = style_dir.name
-                                
-                                for img_file in style_dir.glob("*.png"):
-                                    arcname = f"{char_folder}/Styles/{style_name}/{img_file.name}"
-                                    zipf.write(img_file, arcname)
-                                
-                                if include_metadata:
-                                    for meta_file in style_dir.glob("*.json"):
-                                        arcname = f"{char_folder}/Styles/{style_name}/{meta_file.name}"
-                                        zipf.write(meta_file, arcname)
-                    
-                    # Add character summary
-                    if include_metadata:
-                        summary = self._create_character_summary(char_info)
-                        zipf.writestr(f"{char_folder}/character_summary.json", 
-                                    json.dumps(summary, indent=2))
-                
-                # Add batch summary
-                if include_metadata:
-                    batch_summary = self._create_batch_summary(characters)
-                    zipf.writestr("batch_summary.json", json.dumps(batch_summary, indent=2))
-                    
-                    # Create batch README
-                    readme_content = self._create_batch_readme(characters)
-                    zipf.writestr("README.txt", readme_content)
+            # Write the ZIP straight into the open temporary file
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip', buffering=ARCHIVE_BUFFER_SIZE) as temp_zip:
+                temp_zip_path = temp_zip.name
+                self.create_batch_zip_stream(characters, temp_zip, include_metadata, export_time)
+                file_size = temp_zip.tell()
             
-            # Get file size
-            file_size = os.path.getsize(temp_zip_path)
             size_mb = file_size / (1024 * 1024)
             
             success_msg = f"✅ Batch ZIP created: {len(characters)} characters ({size_mb:.1f} MB)"
@@ -175,7 +145,334 @@ class CharacterZipper:
         except Exception as e:
             return False, f"❌ Error creating batch ZIP: {str(e)}", None
     
-    def _create_character_summary(self, char_info: CharacterInfo) -> Dict[str, Any]:
+    def create_batch_zip_stream(self, characters: List[CharacterInfo], fileobj: BinaryIO,
+                              include_metadata: bool = True,
+                              export_time: Optional[datetime] = None) -> None:
+        """Write a ZIP of multiple characters into a binary file object (file, spooled temp file or response stream)"""
+        for _ in self._write_batch_zip(characters, fileobj, include_metadata, export_time):
+            pass
+    
+    def stream_batch_zip(self, characters: List[CharacterInfo],
+                       include_metadata: bool = True) -> Generator[bytes, None, None]:
+        """Yield a ZIP of multiple characters in chunks as each file is added (e.g. for a streaming HTTP response)"""
+        sink = _ChunkSink()
+        return self._drain_zip_writer(self._write_batch_zip(characters, sink, include_metadata, None), sink)
+    
+    def _write_character_zip(self, char_info: CharacterInfo, fileobj: BinaryIO, include_metadata: bool,
+                           export_time: Optional[datetime]) -> Generator[None, None, None]:
+        """Write a single character's ZIP into fileobj, yielding after each member is appended"""
+        max_workers = ZIP_EXPORT_CONFIG["max_workers"] or os.cpu_count() or 1
+        export_time = export_time or datetime.now()
+        export_info = self._create_export_info(export_time)
+        sources = list(self._character_sources(char_info, include_metadata, export_info))
+        
+        with zipfile.ZipFile(fileobj, 'w', ZIP_EXPORT_CONFIG["text_compression"],
+                           compresslevel=ZIP_EXPORT_CONFIG["text_compresslevel"]) as zipf, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            
+            # Checksum and compress files in parallel, a window at a time to bound
+            # memory, and append the finished members in the original order
+            for start in range(0, len(sources), max_workers):
+                window = sources[start:start + max_workers]
+                for zinfo, payload in executor.map(
+                    lambda source: self._prepare_member(*source, export_time), window
+                ):
+                    self._append_prepared_member(zipf, zinfo, payload)
+                    yield
+            
+            # Create README
+            if include_metadata:
+                readme_content = self._create_readme(char_info, export_time)
+                self._append_prepared_member(
+                    zipf, *self._prepare_member("README.txt", readme_content.encode('utf-8'), export_time)
+                )
+    
+    def _write_batch_zip(self, characters: List[CharacterInfo], fileobj: BinaryIO, include_metadata: bool,
+                       export_time: Optional[datetime]) -> Generator[None, None, None]:
+        """Write a ZIP of multiple characters into fileobj, yielding after each member is appended"""
+        max_workers = ZIP_EXPORT_CONFIG["max_workers"] or os.cpu_count() or 1
+        # One export time and banner shared by every summary and README in the batch
+        export_time = export_time or datetime.now()
+        export_info = self._create_export_info(export_time)
+        
+        with zipfile.ZipFile(fileobj, 'w', ZIP_EXPORT_CONFIG["text_compression"],
+                           compresslevel=ZIP_EXPORT_CONFIG["text_compresslevel"]) as zipf, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            
+            # Read, checksum and compress characters in parallel, a window at a time to
+            # bound memory, and append each one into its own folder in the original order
+            for start in range(0, len(characters), max_workers):
+                window = characters[start:start + max_workers]
+                for members in executor.map(
+                    lambda char: self._prepare_character_members(char, include_metadata, export_info, export_time),
+                    window
+                ):
+                    for zinfo, payload in members:
+                        self._append_prepared_member(zipf, zinfo, payload)
+                        yield
+            
+            # Add batch summary
+            if include_metadata:
+                statistics = self._aggregate_batch_statistics(characters)
+                batch_summary = self._create_batch_summary(characters, export_info, statistics)
+                self._append_prepared_member(
+                    zipf, *self._prepare_member("batch_summary.json", _dump_metadata(batch_summary), export_time)
+                )
+                
+                # Create batch README
+                readme_content = self._create_batch_readme(characters, statistics, export_time)
+                self._append_prepared_member(
+                    zipf, *self._prepare_member("README.txt", readme_content.encode('utf-8'), export_time)
+                )
+    
+    def _drain_zip_writer(self, writer: Generator[None, None, None],
+                        sink: _ChunkSink) -> Generator[bytes, None, None]:
+        """Yield whatever a ZIP writer has written to its sink after each member"""
+        for _ in writer:
+            if sink.chunks:
+                yield sink.drain()
+        
+        # The central directory is written when the writer closes its ZipFile
+        if sink.chunks:
+            yield sink.drain()
+    
+    def _prepare_character_members(self, char_info: CharacterInfo, include_metadata: bool,
+                                 export_info: Dict[str, str],
+                                 export_time: datetime) -> List[Tuple[zipfile.ZipInfo, Any]]:
+        """Read and compress one character's files into its own folder of a batch ZIP"""
+        char_folder = f"{char_info.session_id}_{char_info.character_id}/"
+        return [self._prepare_member(char_folder + arcname, source, export_time)
+                for arcname, source in self._character_sources(char_info, include_metadata, export_info)]
+    
+    def _character_sources(self, char_info: CharacterInfo, include_metadata: bool,
+                         export_info: Dict[str, str]) -> Generator[Tuple[str, Any], None, None]:
+        """Yield (arcname, file path or generated bytes) for every member of a character's export"""
+        # Add base character image
+        if char_info.base_image_path and char_info.base_image_path.exists():
+            yield char_info.base_image_path.name, char_info.base_image_path
+        
+        # Add base metadata, copying the file as saved (already indented JSON) rather than re-serializing it
+        if include_metadata and char_info.base_metadata_path and char_info.base_metadata_path.exists():
+            yield "base_character_metadata.json", char_info.base_metadata_path
+        
+        # Add consistency test images, styled images and their metadata files
+        for arcname, file_path, _ in self._scan_character(char_info):
+            if include_metadata or not arcname.endswith(METADATA_SUFFIXES):
+                yield arcname, file_path
+        
+        # Create comprehensive character summary
+        if include_metadata:
+            summary = self._create_character_summary(char_info, export_info)
+            yield "character_summary.json", _dump_metadata(summary)
+    
+    def _scan_character(self, char_info: CharacterInfo) -> List[Tuple[str, Path, int]]:
+        """List a character's consistency and style files as (arcname, path, size)
+        
+        The walk is reused while the mtimes of the directories it listed are unchanged.
+        """
+        cache_key = str(char_info.path)
+        cached = self._inventory_cache.get(cache_key)
+        if cached and all(self._directory_mtime(path) == mtime for path, mtime in cached[0]):
+            return cached[1]
+        
+        fingerprint = []
+        entries = []
+        
+        consistency_path = char_info.path / "ConsistencyTests"
+        fingerprint.append((consistency_path, self._directory_mtime(consistency_path)))
+        if fingerprint[-1][1] is not None:
+            entries.extend(self._scan_export_directory(consistency_path, "ConsistencyTests/"))
+        
+        styles_path = char_info.path / "Styles"
+        fingerprint.append((styles_path, self._directory_mtime(styles_path)))
+        if fingerprint[-1][1] is not None:
+            try:
+                with os.scandir(styles_path) as it:
+                    style_dirs = [Path(entry.path) for entry in it if entry.is_dir()]
+            except OSError:
+                style_dirs = []
+            for style_dir in style_dirs:
+                fingerprint.append((style_dir, self._directory_mtime(style_dir)))
+                entries.extend(self._scan_export_directory(style_dir, f"Styles/{style_dir.name}/"))
+        
+        self._inventory_cache[cache_key] = (tuple(fingerprint), entries)
+        return entries
+    
+    def _scan_export_directory(self, directory: Path, prefix: str) -> List[Tuple[str, Path, int]]:
+        """List a directory's PNG images, then its metadata files, in a single scandir pass"""
+        groups = {".png": [], ".json": [], ".jsonl": []}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    group = groups.get(os.path.splitext(entry.name)[1])
+                    if group is not None and entry.is_file():
+                        group.append((prefix + entry.name, Path(entry.path), entry.stat().st_size))
+        except OSError:
+            return []
+        return [item for group in groups.values() for item in group]
+    
+    def _directory_mtime(self, directory: Path) -> Optional[int]:
+        """Get a directory's mtime in nanoseconds, or None if it does not exist"""
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _prepare_member(self, arcname: str, source: Any, export_time: datetime) -> Tuple[zipfile.ZipInfo, Any]:
+        """Checksum and compress one member, storing images uncompressed (safe to run in a worker thread)"""
+        compress_type = self._member_compress_type(arcname)
+        
+        if isinstance(source, Path):
+            zinfo = zipfile.ZipInfo.from_file(source, arcname)
+            zinfo.compress_type = compress_type
+            
+            # Stored files are only checksummed here and copied straight from disk when appended
+            if compress_type == zipfile.ZIP_STORED:
+                if not RAW_MEMBER_WRITES:
+                    return zinfo, source
+                zinfo.CRC, version = self._file_crc32(source)
+                zinfo.file_size = zinfo.compress_size = version[2]
+                return zinfo, (source, version)
+            data = source.read_bytes()
+        else:
+            # Same permissions ZipFile.writestr gives generated members, dated at the export time
+            zinfo = zipfile.ZipInfo(arcname, date_time=export_time.timetuple()[:6])
+            zinfo.external_attr = 0o600 << 16
+            zinfo.compress_type = compress_type
+            data = source
+        
+        zinfo.file_size = len(data)
+        if not RAW_MEMBER_WRITES:
+            return zinfo, data
+        zinfo.CRC = deflate_zlib.crc32(data)
+        
+        # zlib, bz2 and lzma release the GIL, so workers compress on separate cores
+        level = ZIP_EXPORT_CONFIG["text_compresslevel"]
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            # Raw deflate stream (negative wbits), as ZIP stores it; ISA-L only has levels 0-3
+            level = min(level, 3) if deflate_zlib is not zlib else level
+            compressor = deflate_zlib.compressobj(level, zlib.DEFLATED, -15)
+        else:
+            compressor = zipfile._get_compressor(zinfo.compress_type, level)
+        payload = compressor.compress(data) + compressor.flush() if compressor else data
+        if zinfo.compress_type == zipfile.ZIP_LZMA:
+            zinfo.flag_bits |= 0x02  # End-of-stream marker, as ZipFile writes LZMA members
+        zinfo.compress_size = len(payload)
+        return zinfo, payload
+    
+    def _file_crc32(self, file_path: Path) -> Tuple[int, Tuple[int, int, int, int]]:
+        """Compute the CRC-32 of a file, over a memory map for large files and in chunks otherwise
+        
+        Also returns the version of the file that was read, see _file_version.
+        """
+        crc = 0
+        with open(file_path, 'rb') as f:
+            version = self._file_version(f)
+            # One CRC call over the whole mapping, with no copies into Python bytes;
+            # madvise(MADV_SEQUENTIAL) asks the kernel for aggressive readahead
+            if version[2] >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    return deflate_zlib.crc32(mapped), version
+            
+            for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                crc = deflate_zlib.crc32(chunk, crc)
+        return crc, version
+    
+    def _file_version(self, f: BinaryIO) -> Tuple[int, int, int, int]:
+        """Identify an open file's contents by (device, inode, size, mtime)"""
+        st = os.fstat(f.fileno())
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def _append_prepared_member(self, zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, payload: Any) -> None:
+        """Append a member prepared by _prepare_member without recompressing it"""
+        if not RAW_MEMBER_WRITES:
+            # Public API: ZipFile checksums and compresses the member as it is written
+            if isinstance(payload, Path):
+                with open(payload, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            else:
+                zipf.writestr(zinfo, payload, compresslevel=ZIP_EXPORT_CONFIG["text_compresslevel"])
+            return
+        
+        zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+        # ZipFile has no public API for raw members; this mirrors what writestr() writes
+        with zipf._lock:
+            zipf._writecheck(zinfo)
+            zipf._didModify = True
+            zinfo.header_offset = zipf.fp.tell()
+            zipf.fp.write(zinfo.FileHeader(zip64))
+            if isinstance(payload, tuple):
+                self._copy_file_payload(zipf.fp, *payload, zinfo)
+            else:
+                zipf.fp.write(payload)
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+            zipf.start_dir = zipf.fp.tell()
+    
+    def _copy_file_payload(self, dst: Any, file_path: Path, version: Tuple[int, int, int, int],
+                         zinfo: zipfile.ZipInfo) -> None:
+        """Copy a stored file into the archive, in-kernel with sendfile where available
+        
+        The header is already written, so a file that is no longer the version
+        _prepare_member checksummed, or whose copied size or CRC does not match,
+        raises instead of leaving a corrupt archive.
+        """
+        dst_fd = self._sendfile_descriptor(dst)
+        with open(file_path, 'rb') as src:
+            if self._file_version(src) != version:
+                raise OSError(f"{file_path} changed while being added to the ZIP")
+            
+            if dst_fd is None:
+                # Checksum the bytes actually copied
+                copied = crc = 0
+                for chunk in iter(lambda: src.read(COPY_BUFFER_SIZE), b''):
+                    dst.write(chunk)
+                    copied += len(chunk)
+                    crc = deflate_zlib.crc32(chunk, crc)
+            else:
+                # sendfile writes to the descriptor, so flush Python's buffer first and
+                # seek afterwards to move the file object past the copied bytes
+                dst.flush()
+                copied = 0
+                while copied < zinfo.file_size:
+                    sent = os.sendfile(dst_fd, src.fileno(), copied, zinfo.file_size - copied)
+                    if not sent:
+                        break
+                    copied += sent
+                dst.seek(0, os.SEEK_END)
+                # Unchanged since it was checksummed, checked above
+                crc = zinfo.CRC
+        
+        if copied != zinfo.file_size or crc != zinfo.CRC:
+            raise OSError(f"{file_path} changed while being added to the ZIP")
+    
+    def _sendfile_descriptor(self, dst: Any) -> Optional[int]:
+        """Get the descriptor sendfile can write to, or None if dst is not a seekable OS file"""
+        # fileno() would force a spooled file to disk, and ZipFile wraps unseekable streams
+        if not USE_SENDFILE or isinstance(dst, tempfile.SpooledTemporaryFile):
+            return None
+        try:
+            return dst.fileno() if dst.seekable() else None
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+    
+    def _member_compress_type(self, zinfo_or_arcname: Any) -> int:
+        """Pick the compression method for a ZIP member from its file extension"""
+        arcname = getattr(zinfo_or_arcname, "filename", zinfo_or_arcname)
+        if Path(arcname).suffix.lower() in STORED_SUFFIXES:
+            return ZIP_EXPORT_CONFIG["image_compression"]
+        return ZIP_EXPORT_CONFIG["text_compression"]
+    
+    def _create_export_info(self, export_time: datetime) -> Dict[str, str]:
+        """Create the export banner included in character and batch summaries"""
+        return {
+            "export_date": export_time.isoformat(),
+            "export_tool": "AI Character Creation Studio"
+        }
+    
+    def _create_character_summary(self, char_info: CharacterInfo, export_info: Dict[str, str]) -> Dict[str, Any]:
         """Create comprehensive character summary"""
         return {
             "character_info": {
@@ -192,38 +489,49 @@ class CharacterZipper:
             },
             "character_config": char_info.character_config or {},
             "generation_metadata": char_info.base_metadata or {},
-            "export_info": {
-                "export_date": datetime.now().isoformat(),
-                "export_tool": "AI Character Creation Studio"
-            }
+            "export_info": export_info
         }
     
-    def _create_batch_summary(self, characters: List[CharacterInfo]) -> Dict[str, Any]:
-        """Create summary for batch of characters"""
-        total_images = sum(char.total_images for char in characters)
-        
-        # Aggregate style counts
-        style_totals = {}
+    def _aggregate_batch_statistics(self, characters: List[CharacterInfo]) -> Dict[str, Any]:
+        """Total the image counts and creation date range of a batch in a single pass"""
+        total_images = 0
+        total_realistic = 0
+        style_totals = Counter()
+        earliest = latest = None
         for char in characters:
-            for style_name, count in char.styled_counts.items():
-                style_totals[style_name] = style_totals.get(style_name, 0) + count
+            total_images += char.total_images
+            total_realistic += char.realistic_count
+            style_totals.update(char.styled_counts)
+            if earliest is None or char.creation_ctime < earliest:
+                earliest = char.creation_ctime
+            if latest is None or char.creation_ctime > latest:
+                latest = char.creation_ctime
         
-        # Date range
-        dates = [char.creation_date for char in characters]
+        return {
+            "total_images": total_images,
+            "total_realistic_variations": total_realistic,
+            "style_breakdown": dict(style_totals),
+            "earliest_ctime": earliest,
+            "latest_ctime": latest
+        }
+    
+    def _create_batch_summary(self, characters: List[CharacterInfo], export_info: Dict[str, str],
+                            statistics: Dict[str, Any]) -> Dict[str, Any]:
+        """Create summary for batch of characters"""
+        earliest, latest = statistics["earliest_ctime"], statistics["latest_ctime"]
         
         return {
             "batch_info": {
                 "total_characters": len(characters),
-                "export_date": datetime.now().isoformat(),
-                "export_tool": "AI Character Creation Studio"
+                **export_info
             },
             "aggregate_statistics": {
-                "total_images": total_images,
-                "total_realistic_variations": sum(char.realistic_count for char in characters),
-                "style_breakdown": style_totals,
+                "total_images": statistics["total_images"],
+                "total_realistic_variations": statistics["total_realistic_variations"],
+                "style_breakdown": statistics["style_breakdown"],
                 "creation_date_range": {
-                    "earliest": min(dates).isoformat() if dates else None,
-                    "latest": max(dates).isoformat() if dates else None
+                    "earliest": datetime.fromtimestamp(earliest).isoformat() if earliest is not None else None,
+                    "latest": datetime.fromtimestamp(latest).isoformat() if latest is not None else None
                 }
             },
             "characters": [
@@ -238,7 +546,7 @@ class CharacterZipper:
             ]
         }
     
-    def _create_readme(self, char_info: CharacterInfo) -> str:
+    def _create_readme(self, char_info: CharacterInfo, export_time: datetime) -> str:
         """Create README content for character ZIP"""
         return f"""AI Character Creation Studio - Character Export
 ==================================================
@@ -260,7 +568,8 @@ Folder Structure:
 ├── ConsistencyTests/
 │   ├── Realistic_001.png
 │   ├── Realistic_002.png
-│   └── ... (metadata files)
+│   ├── consistency.jsonl (per-image metadata, one JSON object per line)
+│   └── ...
 └── Styles/
     ├── Studio Ghibli/
     └── Rick & Morty/
@@ -270,14 +579,16 @@ Files Description:
 - ConsistencyTests/: Character variations maintaining consistency
 - Styles/: Stylized versions using different artistic styles
 - *_metadata.json: Generation parameters and API responses
+- *.jsonl: Per-image generation parameters and API responses, one line per image
 
 Generated by: AI Character Creation Studio
-Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Export Date: {export_time.strftime('%Y-%m-%d %H:%M:%S')}
 """
     
-    def _create_batch_readme(self, characters: List[CharacterInfo]) -> str:
+    def _create_batch_readme(self, characters: List[CharacterInfo], statistics: Dict[str, Any],
+                           export_time: datetime) -> str:
         """Create README content for batch ZIP"""
-        total_images = sum(char.total_images for char in characters)
+        export_date = export_time.strftime('%Y-%m-%d %H:%M:%S')
         
         character_list = "\n".join([
             f"- {char.character_id} ({char.total_images} images) - {char.creation_date.strftime('%Y-%m-%d')}"
@@ -289,8 +600,8 @@ Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 Batch Information:
 - Total Characters: {len(characters)}
-- Total Images: {total_images}
-- Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+- Total Images: {statistics["total_images"]}
+- Export Date: {export_date}
 
 Included Characters:
 {character_list}
@@ -311,7 +622,7 @@ Each character folder contains:
 - Complete metadata and generation parameters
 
 Generated by: AI Character Creation Studio
-Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Export Date: {export_date}
 """
     
     def cleanup_temp_file(self, temp_path: str) -> None:
@@ -324,30 +635,27 @@ Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     
     def get_estimated_zip_size(self, characters: List[CharacterInfo]) -> Tuple[int, str]:
         """Estimate ZIP file size for characters"""
-        total_size = 0
+        image_size = 0
+        metadata_size = 0
         
         try:
             for char in characters:
-                # Base image
-                if char.base_image_path and char.base_image_path.exists():
-                    total_size += char.base_image_path.stat().st_size
-                
-                # Consistency images
-                consistency_path = char.path / "ConsistencyTests"
-                if consistency_path.exists():
-                    for img_file in consistency_path.glob("*.png"):
-                        total_size += img_file.stat().st_size
+                # Base image (one stat, rather than exists() followed by stat())
+                if char.base_image_path:
+                    try:
+                        image_size += char.base_image_path.stat().st_size
+                    except OSError:
+                        pass
                 
-                # Styled images
-                styles_path = char.path / "Styles"
-                if styles_path.exists():
-                    for style_dir in styles_path.iterdir():
-                        if style_dir.is_dir():
-                            for img_file in style_dir.glob("*.png"):
-                                total_size += img_file.stat().st_size
+                # Consistency and styled images, and their metadata files
+                for arcname, _, size in self._scan_character(char):
+                    if arcname.endswith(METADATA_SUFFIXES):
+                        metadata_size += size
+                    else:
+                        image_size += size
             
-            # Account for compression (estimate 70% of original size)
-            estimated_zip_size = int(total_size * 0.7)
+            # Account for compression: images are stored as-is, JSON deflates to roughly 30%
+            estimated_zip_size = image_size + int(metadata_size * 0.3)
             
             # Format size
             if estimated_zip_size > 1024 * 1024 * 1024:  # GB